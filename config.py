@@ -5,12 +5,60 @@ ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 BUSINESS_CLEANING_CONFIG = {
     'category_filter': 'Italian',
     'state_filter': 'PA',
+    'partitions': [('PA', 'Italian')],  # (state, category) pairs cleaned together by partition_business
     # Add more configurable parameters as needed
 }
 
 # Configurations for cleaning review data
 REVIEW_CLEANING_CONFIG = {
-    'chunk_size': 10000,
+    'chunk_bytes': 16 * 1024 * 1024,  # Size of the byte range of review.json parsed per batch
+    'reader_workers': None,  # Number of JSON parser processes; None uses all cores
+    'workers': None,  # Number of text cleaning processes; None uses all cores, 1 cleans in-process
+    'dedupe_bloom_capacity': None,  # Expected number of reviews; set it to dedupe with a Bloom filter
     'business_ids': [],  # This will be populated dynamically
     # Other configurations...
 }
+
+# Configurations for cleaning the Trips by Distance data
+TRIPS_CLEANING_CONFIG = {
+    'chunk_size': 500000,
+    'state_filter': 'PA',
+}
+
+# Configurations for cleaning the ACS census tables into ZIP-by-variable matrices
+CENSUS_CLEANING_CONFIG = {
+    'tables': {  # Table name -> file name in data/raw/Census Bureau Data
+        'DP03': 'DP03.csv',
+        'DP04': 'DP04.csv',
+        'DP05': 'DP05.csv',
+        'S0801': 'ACSST5Y2017.S0801-2023-11-15T172625.csv',
+        'S1901': 'ACSST5Y2017.S1901-2023-11-15T172704.csv',
+    },
+    'workers': None,  # Number of tables cleaned at once; None uses all cores
+}
+
+# Configurations for the online geocoder used when the offline ZIP code lookup has no answer
+GEOCODING_CONFIG = {
+    'user_agent': 'mangiaMetrics',
+    'domain': 'nominatim.openstreetmap.org',  # Point this at a local Nominatim-compatible server for tests
+    'scheme': 'https',
+    'max_concurrency': 4,  # Number of requests in flight at once
+    'rate_limit': 1.0,  # Maximum number of requests started per second (Nominatim's usage policy)
+    'max_retries': 3,  # Retries of a request that timed out or hit an unavailable/rate-limited server
+    'retry_backoff': 2.0,  # Seconds to wait before the first retry; doubled for every further retry
+    'coordinate_precision': 5,  # Decimals coordinates are rounded to for the cache key (~1 m)
+}
+
+# Configurations for the shared sentiment scorer and its persistent score store
+SENTIMENT_CONFIG = {
+    'workers': None,  # Number of scoring processes; None uses all cores, 1 scores in-process
+    'batch_size': 2000,  # Number of review texts sent to a worker per task
+    'flush_size': 50000,  # Number of new scores gathered before they are saved to the store
+    'max_parts': 20,  # Number of store files above which they are merged into one
+}
+
+# Configurations for the on-disk columnar cache used by the data loaders
+CACHE_CONFIG = {
+    'enabled': True,
+    'suffix': '.cache.parquet',  # Cache files are written next to their source with this suffix
+}
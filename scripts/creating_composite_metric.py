@@ -3,28 +3,21 @@ import os
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 
+from scripts.utility.census_store import load_census_store
 from scripts.utility.path_utils import get_path_from_root
 
-# Load the datasets
-common_path = get_path_from_root("data", "final")
-final_dp03 = pd.read_csv(os.path.join(common_path, "final_dp03.csv"))
-final_dp04 = pd.read_csv(os.path.join(common_path, "final_dp04.csv"))
-final_dp05 = pd.read_csv(os.path.join(common_path, "final_dp05.csv"))
+# Load the census store and the top features
+census_store = load_census_store()
 top_features = pd.read_csv(get_path_from_root("results", "modeling", "pca", "top_features_merged.csv"))
 
-# Merging the datasets on 'ZIP_CODE'
-merged_data = pd.merge(final_dp03, final_dp04, on='ZIP_CODE', how='outer')
-merged_data = pd.merge(merged_data, final_dp05, on='ZIP_CODE', how='outer')
-
 # Extracting the feature names from the 'top_features' dataset
 top_feature_names = top_features['Feature'].tolist()
 
-# Selecting these features from the merged dataset
-# Adding 'ZIP_CODE' to the list as it's our key column
-selected_features = ['ZIP_CODE'] + [feature for feature in top_feature_names if feature in merged_data.columns]
+# Selecting these features from the store, keyed by 'ZIP_CODE'
+selected_features = [feature for feature in top_feature_names if feature in census_store]
 
 # Creating a new dataset with only the top features
-top_features_data = merged_data[selected_features]
+top_features_data = census_store.select(*selected_features).reset_index()
 
 # Normalizing the data (excluding the ZIP_CODE column)
 scaler = MinMaxScaler()
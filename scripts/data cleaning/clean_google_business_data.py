@@ -4,6 +4,11 @@ from datetime import datetime
 
 import pandas as pd
 
+from scripts.utility.path_utils import get_path_from_root
+
+# Address, city, state and ZIP code of a 'Business Name, Address, City, State ZIP' address string
+ADDRESS_PATTERN = re.compile(r'[^,]+,\s*(?P<Address>[^,]+),\s*(?P<City>[^,]+),\s*(?P<State>[A-Z]{2})\s*(?P<ZIP>\d{5})')
+
 
 def process_google_hours(hours_list):
     # Check if hours_list is a list and not null
@@ -28,16 +33,10 @@ def process_google_hours(hours_list):
     return processed_hours
 
 
-def extract_address_components(address):
-    # Regular expression to extract address, city, state, and ZIP code
-    # Assumes the format 'Business Name, Address, City, State ZIP'
-    regex = r'[^,]+,\s*(?P<Address>[^,]+),\s*(?P<City>[^,]+),\s*(?P<State>[A-Z]{2})\s*(?P<ZIP>\d{5})'
-    match = re.search(regex, address)
-
-    if match:
-        return match.groupdict()
-    else:
-        return {'address': '', 'city': '', 'state': '', 'ZIP Code': ''}
+def extract_address_components(addresses):
+    # Extract address, city, state, and ZIP code of every address in one pass over the column
+    # Assumes the format 'Business Name, Address, City, State ZIP'; addresses that don't match get empty strings
+    return addresses.str.extract(ADDRESS_PATTERN).fillna('')
 
 
 def convert_to_24hr(time_str):
@@ -67,8 +66,12 @@ def convert_to_24hr(time_str):
 def convert_hours_columns(df):
     hours_columns = [col for col in df.columns if col.startswith('hours_')]
 
+    # Opening hours repeat across businesses and days, so convert each distinct string once and map it back
+    distinct_hours = pd.unique(df[hours_columns].to_numpy().ravel())
+    converted_hours = {time_str: convert_to_24hr(time_str) for time_str in distinct_hours}
+
     for col in hours_columns:
-        df[col] = df[col].apply(convert_to_24hr)
+        df[col] = df[col].map(converted_hours)
 
     return df
 
@@ -91,12 +94,9 @@ def clean_google_business_data(file_path_google):
         'state': 'is_open'
     })
 
-    # Apply the function to the 'hours' column in the Google data DataFrame
-    google_df['hours'] = google_df['hours'].apply(process_google_hours)
-
-    # Split the dictionary into separate columns
-    hours_df = google_df['hours'].apply(pd.Series)
-    google_df = pd.concat([google_df.drop(['hours'], axis=1), hours_df], axis=1)
+    # Split the 'hours' lists into one column per day, aligned with the businesses they belong to
+    hours_df = pd.DataFrame([process_google_hours(hours) for hours in google_df['hours']], index=google_df.index)
+    google_df = google_df.drop(['hours'], axis=1).join(hours_df)
 
     # Handle missing values
     google_df.dropna(subset=['category'], inplace=True)
@@ -117,12 +117,9 @@ def clean_google_business_data(file_path_google):
     google_df['stars'] = pd.to_numeric(google_df['stars'], errors='coerce')
     google_df['review_count'] = pd.to_numeric(google_df['review_count'], errors='coerce')
 
-    # Apply the function to split address into components
-    address_components = google_df['address'].apply(extract_address_components)
-    address_components_df = address_components.apply(pd.Series)
-
-    # Concatenate the new address component columns with the main DataFrame
-    google_df = pd.concat([google_df, address_components_df], axis=1)
+    # Split the address into components, replacing the original 'address' column
+    address_components_df = extract_address_components(google_df['address'])
+    google_df = google_df.drop(['address'], axis=1).join(address_components_df)
 
     google_df = google_df.rename(columns={
         'Address': 'address',
@@ -131,18 +128,17 @@ def clean_google_business_data(file_path_google):
         'City': 'city'
     })
 
-    # Drop the original 'business_address' column as it's no longer needed
+    # Drop the columns that are no longer needed
     google_df.drop(['address', 'category', 'state'], axis=1, inplace=True)
 
     google_df = convert_hours_columns(google_df)
 
     # Save the cleaned Google Maps data to CSV
-    google_df.to_csv('C:\\Users\\shour\\PycharmProjects\\MangiaMetrics_628\\data\\interim\\cleaned_google_business.csv',
-                     index=False)
+    google_df.to_csv(get_path_from_root("data", "interim", "cleaned_google_business.csv"), index=False)
 
     # return google_df
 
 
 if __name__ == "__main__":
-    file_path_google = 'C:\\Users\\shour\\PycharmProjects\\MangiaMetrics_628\\data\\raw\\Google Maps Data\\business_PA.json'
+    file_path_google = get_path_from_root("data", "raw", "Google Maps Data", "business_PA.json")
     clean_google_business_data(file_path_google)
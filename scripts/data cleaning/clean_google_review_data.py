@@ -1,61 +1,21 @@
+import glob
 import os
-import re
-from datetime import datetime
+import shutil
 
-import nltk
 import pandas as pd
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import pyarrow as pa
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
+from scripts.utility.checkpoint import clear_checkpoint, load_checkpoint, save_checkpoint
+from scripts.utility.json_reader import RANGE_BYTES, read_json_lines, split_byte_ranges
 from scripts.utility.path_utils import get_path_from_root
+from scripts.utility.text_processing import preprocess_texts
 
 
 # Ensure required NLTK data is downloaded
 # nltk.download("stopwords")
 # nltk.download("wordnet")
-# nltk.download("punkt")
-
-
-def preprocess_text(text):
-    # Check if the text is not a string
-    if not isinstance(text, str):
-        return ""
-
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-
-    # Replace special characters and numbers
-    text = re.sub(r'[^a-zA-Z\s]', '', text)
-
-    # Tokenization and lowercase
-    words = nltk.word_tokenize(text.lower())
-
-    # Stopword removal
-    stop_words = set(stopwords.words("english"))
-    words = [word for word in words if word not in stop_words]
-
-    # Negation handling
-    words = ['not_' + words[i + 1] if words[i] == 'not' and i + 1 < len(words) else words[i] for i in range(len(words))]
-
-    # Lemmatization
-    lemmatizer = WordNetLemmatizer()
-    words = [lemmatizer.lemmatize(word) for word in words]
-    words = [lemmatizer.lemmatize(word, pos='n') for word in words]  # Lemmatize nouns
-    words = [lemmatizer.lemmatize(word, pos='v') for word in words]  # Lemmatize verbs
-
-    # Rejoin words into a string
-    return " ".join(words)
-
-
-def unix_to_datetime(unix_time):
-    """ Convert Unix timestamp to datetime """
-    try:
-        # Convert Unix timestamp to datetime, assuming the timestamp is in milliseconds
-        return datetime.utcfromtimestamp(int(unix_time) / 1000.0)
-    except (ValueError, TypeError):
-        # Return None or a default datetime in case of an error
-        return None
 
 
 def get_cleaned_gmap_ids():
@@ -82,41 +42,67 @@ def get_cleaned_gmap_ids():
 
 
 def process_google_reviews_chunk(chunk):
-    # Apply preprocessing to each chunk
-    chunk['datetime'] = chunk['time'].apply(unix_to_datetime)
-    chunk = chunk.dropna(subset=['datetime'])
-    chunk['date'] = chunk['datetime'].dt.date
-    chunk['time'] = chunk['datetime'].dt.strftime('%H:%M:%S')
-    chunk.drop(['datetime'], axis=1, inplace=True)
-    chunk['text'] = chunk['text'].apply(preprocess_text)
+    # Convert the epoch milliseconds in one pass; unparseable timestamps become NaT and are dropped
+    timestamps = pd.to_datetime(pd.to_numeric(chunk['time'], errors='coerce'), unit='ms', errors='coerce')
+    chunk = chunk.assign(datetime=timestamps).dropna(subset=['datetime'])
+
+    # Split into calendar date, time of day and the year used to partition the output
+    chunk['date'] = chunk['datetime'].dt.normalize()
+    chunk['time'] = chunk['datetime'] - chunk['date']
+    chunk['year'] = chunk['datetime'].dt.year.astype('int16')
+    chunk = chunk.drop(columns=['datetime'])
+    chunk['text'] = preprocess_texts(chunk['text'])
     return chunk
 
 
-def clean_google_reviews(file_path_google, chunk_size=10000):
+def _get_part_template(source_offset):
+    # Parts are named after the source offset they end at, so a resumed run can find the ones it must redo
+    return f"part-{source_offset:015d}-{{i}}.parquet"
+
 
-    # Convert to DataFrame
-    concatenated_df = pd.DataFrame()
+def _remove_uncommitted_parts(dataset_path, source_offset):
+    # Drop parts written after the last checkpoint; their records are read and written again
+    for part_path in glob.glob(os.path.join(dataset_path, "*", "part-*.parquet")):
+        if int(os.path.basename(part_path).split('-')[1]) > source_offset:
+            os.remove(part_path)
 
-    with open(file_path_google, 'r') as file:
-        # Calculate total number of chunks (approximation)
-        total_size = os.path.getsize(file_path_google)
-        total_chunks = total_size // (chunk_size * 100)  # Adjust factor based on average line length
 
-        for chunk in tqdm(pd.read_json(file, lines=True, chunksize=chunk_size), total=total_chunks):
+def clean_google_reviews(file_path_google, chunk_bytes=RANGE_BYTES, workers=None):
+    path_to_save = os.path.join(get_path_from_root("data", "interim"), 'cleaned_google_reviews')
+
+    # Pick up after the last committed chunk if an earlier run was interrupted
+    checkpoint = load_checkpoint(path_to_save, file_path_google)
+    start = checkpoint['source_offset'] if checkpoint else 0
+    if checkpoint:
+        print(f"Resuming Google review cleaning at byte {start}")
+        _remove_uncommitted_parts(path_to_save, start)
+    elif os.path.isdir(path_to_save):
+        shutil.rmtree(path_to_save)
+
+    # Split the file into line-aligned byte ranges that are parsed in parallel and returned in order
+    total_chunks = len(split_byte_ranges(file_path_google, chunk_bytes, start=start))
+    batches = read_json_lines(file_path_google, workers=workers, range_bytes=chunk_bytes, start=start,
+                              with_offsets=True)
+
+    for source_offset, chunk in tqdm(batches, total=total_chunks):
+        if not chunk.empty:
             processed_chunk = process_google_reviews_chunk(chunk)
-            concatenated_df = pd.concat([concatenated_df, processed_chunk], ignore_index=True)
 
-    # Drop columns that are not needed and rename columns
-    concatenated_df.drop(['name', 'pics', 'resp'], axis=1, inplace=True)
-    concatenated_df.rename(columns={'rating': 'stars'}, inplace=True)
+            # Drop columns that are not needed and rename columns
+            processed_chunk = processed_chunk.drop(columns=['name', 'pics', 'resp'], errors='ignore')
+            processed_chunk = processed_chunk.rename(columns={'rating': 'stars'})
+
+            # Append the cleaned chunk as new files in its year partitions; nothing is held across chunks
+            table = pa.Table.from_pandas(processed_chunk, preserve_index=False)
+            pq.write_to_dataset(table, path_to_save, partition_cols=['year'],
+                                basename_template=_get_part_template(source_offset))
 
-    # Save the cleaned Google Maps review data to CSV
-    path = get_path_from_root("data", "interim")
-    concatenated_df.to_csv(os.path.join(path, 'cleaned_google_reviews.csv'), index=False)
+        # The parts are closed once written, so record how far into the source we got
+        save_checkpoint(path_to_save, file_path_google, source_offset, 0)
 
-    # return concatenated_df
+    clear_checkpoint(path_to_save)
 
 
-# Usage
-file_path_google = 'C:\\Users\\shour\\PycharmProjects\\MangiaMetrics_628\\data\\raw\\Google Maps Data\\review_PA.json'
-clean_google_reviews(file_path_google)
+if __name__ == "__main__":
+    file_path_google = get_path_from_root("data", "raw", "Google Maps Data", "review_PA.json")
+    clean_google_reviews(file_path_google)
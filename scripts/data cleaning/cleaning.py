@@ -1,17 +1,21 @@
-import collections
+import hashlib
 import json
 import logging
 import os
-import re
+import shutil
 
-import nltk
 # import emoji
 import pandas as pd
-from nltk.corpus import stopwords
 
-from config import BUSINESS_CLEANING_CONFIG, REVIEW_CLEANING_CONFIG
-from scripts.utility.data_loader import get_business_df
+from config import BUSINESS_CLEANING_CONFIG, REVIEW_CLEANING_CONFIG, TRIPS_CLEANING_CONFIG
+from scripts.utility.business_attributes import decode_attributes
+from scripts.utility.checkpoint import clear_checkpoint, load_checkpoint, open_output_for_resume, save_checkpoint
+from scripts.utility.data_loader import STATEWIDE_PARTITION, get_business_df
+from scripts.utility.dedupe import StreamingDeduplicator
+from scripts.utility.json_reader import read_field_values, read_json_lines
+from scripts.utility.parallel import imap_ordered
 from scripts.utility.path_utils import get_path_from_root
+from scripts.utility.text_processing import preprocess_texts
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
@@ -20,101 +24,127 @@ logger = logging.getLogger(__name__)
 # Display all columns
 pd.set_option('display.max_columns', None)
 
+# Constants
+JSON_BATCH_SIZE = 10000  # Number of records serialized at once by save_json_records
+
+# Column types of Trips_by_Distance.csv; trip counts stay float64 since they exceed float32's exact range
+TRIPS_DTYPES = {
+    'State Postal Code': 'category',
+    'County FIPS': 'Int32',
+    'County Name': 'str',
+    'Week': 'Int8',
+    'Month': 'Int8',
+}
+
 
 # nltk.download("stopwords")
 # nltk.download("wordnet")
-# nltk.download("punkt")
+
+
+def get_sidecar_path(path):
+    # Columnar copy written next to a JSON-lines output
+    return os.path.splitext(path)[0] + ".parquet"
 
 
 def get_cleaned_business_ids():
     path = get_path_from_root("data", "interim", "cleaned_business.json")
+    sidecar_path = get_sidecar_path(path)
     try:
+        # Fast path: read only the ID column from the columnar sidecar, if it is at least as new as the JSON
+        if os.path.exists(sidecar_path) and os.path.getmtime(sidecar_path) >= os.path.getmtime(path):
+            business_ids = pd.read_parquet(sidecar_path, columns=['business_id'])['business_id']
+            return business_ids.unique().tolist()
+
         with open(path, 'r') as f:
-            data = json.load(f)
-        cleaned_business_df = pd.DataFrame(data)
-        return cleaned_business_df['business_id'].unique().tolist()
+            is_json_array = f.read(1) == '['
+
+        if is_json_array:
+            # Legacy output written as one indented JSON array
+            with open(path, 'r') as f:
+                data = json.load(f)
+            return list(dict.fromkeys(record['business_id'] for record in data))
+
+        # JSON lines: pull the IDs out of the raw lines without building a DataFrame
+        return list(dict.fromkeys(read_field_values(path, 'business_id')))
     except Exception as e:
         logging.error(f"Error in get_cleaned_business_ids: {e}")
         return []
 
 
-def parse_attributes(attributes):
-    # Return the attributes as-is if it's a dictionary, or an empty dictionary if None
-    return attributes if isinstance(attributes, dict) else {}
-
-
-def flatten_dict(d, parent_key='', sep='_'):
-    items = []
-    for k, v in d.items():
-        new_key = parent_key + sep + k if parent_key else k
-        if isinstance(v, collections.abc.MutableMapping):
-            try:
-                nested_dict = json.loads(v.replace("'", "\""))
-                items.extend(flatten_dict(nested_dict, new_key, sep=sep).items())
-            except (json.JSONDecodeError, AttributeError):
-                items.append((new_key, v))
-        else:
-            items.append((new_key, v))
-    return dict(items)
-
-
 def flatten_attributes(business_df):
-    # Parse the attribute column into dictionaries
-    business_df['attributes'] = business_df['attributes'].apply(parse_attributes)
+    # Decode the attribute dictionaries into one typed column per attribute (and per nested sub-attribute)
+    return business_df.join(decode_attributes(business_df['attributes']))
 
-    return business_df.join(pd.DataFrame([flatten_dict(row) for row in business_df['attributes']]))
 
+def save_json_records(df, path, batch_size=JSON_BATCH_SIZE):
+    """
+    Save a DataFrame as JSON lines, one batch of records at a time, plus a Parquet sidecar for columnar reads.
 
-def save_pretty_json(df, path):
+    :param df: DataFrame to save
+    :param path: Path to the JSON-lines file
+    :param batch_size: Number of records serialized at once
+    """
     with open(path, 'w') as f:
         try:
-            json_data = df.to_dict(orient='records')
-            json.dump(json_data, f, indent=4)
+            for start in range(0, len(df), batch_size):
+                records = df.iloc[start:start + batch_size].to_json(orient='records', lines=True)
+                f.write(records if records.endswith('\n') else records + '\n')
         except Exception as e:
-            logging.error(f"Error in save_pretty_json: {e}")
+            logging.error(f"Error in save_json_records: {e}")
             raise
 
-
-def clean_business():
+    sidecar_path = get_sidecar_path(path)
     try:
-        business_df = get_business_df()
+        df.to_parquet(sidecar_path, index=False)
+    except Exception as e:
+        # The JSON lines are complete on their own; readers fall back to them without the sidecar
+        logging.warning(f"Could not write columnar sidecar {sidecar_path}: {e}")
+        if os.path.exists(sidecar_path):
+            os.remove(sidecar_path)
+
+
+def clean_business_df(business_df):
+    # Remove businesses that are closed
+    business_df = business_df[business_df["is_open"] == 1]
 
-        # Filter for restaurants in Pennsylvania
-        business_df = business_df[
-            business_df['categories'].str.contains(BUSINESS_CLEANING_CONFIG['category_filter'], case=False, na=False)]
-        business_df = business_df[business_df['state'] == BUSINESS_CLEANING_CONFIG['state_filter']]
+    # Remove duplicate entries based on business_id
+    business_df = business_df.drop_duplicates(subset="business_id")
 
-        # Remove businesses that are closed
-        business_df = business_df[business_df["is_open"] == 1]
+    # Normalize text fields
+    business_df["city"] = business_df["city"].str.lower()
+    business_df["categories"] = business_df["categories"].str.lower()
+    business_df["address"] = business_df["address"].str.lower()
 
-        # Remove duplicate entries based on business_id
-        business_df = business_df.drop_duplicates(subset="business_id")
+    # Handle missing values
+    business_df.dropna(subset=["categories"], inplace=True)
 
-        # Normalize text fields
-        business_df["city"] = business_df["city"].str.lower()
-        business_df["categories"] = business_df["categories"].str.lower()
-        business_df["address"] = business_df["address"].str.lower()
+    # Data Type Correction
+    business_df["stars"] = pd.to_numeric(business_df["stars"], errors='coerce')
+    business_df["review_count"] = pd.to_numeric(business_df["review_count"], errors='coerce')
 
-        # Handle missing values
-        business_df.dropna(subset=["categories"], inplace=True)
+    # Error Checking
+    business_df = business_df[(business_df["stars"] >= 0) & (business_df["review_count"] >= 0)]
+    business_df = business_df[
+        (business_df["latitude"].between(-90, 90)) & (business_df["longitude"].between(-180, 180))]
 
-        # Data Type Correction
-        business_df["stars"] = pd.to_numeric(business_df["stars"], errors='coerce')
-        business_df["review_count"] = pd.to_numeric(business_df["review_count"], errors='coerce')
+    return flatten_attributes(business_df)
 
-        # Error Checking
-        business_df = business_df[(business_df["stars"] >= 0) & (business_df["review_count"] >= 0)]
-        business_df = business_df[
-            (business_df["latitude"].between(-90, 90)) & (business_df["longitude"].between(-180, 180))]
 
-        business_df = flatten_attributes(business_df)
+def clean_business():
+    try:
+        # Filter for restaurants in Pennsylvania while the dump is parsed
+        business_df = get_business_df(filters=[
+            ('categories', 'contains', BUSINESS_CLEANING_CONFIG['category_filter']),
+            ('state', '==', BUSINESS_CLEANING_CONFIG['state_filter']),
+        ])
+
+        business_df = clean_business_df(business_df)
 
         # Save cleaned data
         path_to_save = get_path_from_root("data", "interim")
         os.makedirs(path_to_save, exist_ok=True)
 
-        save_pretty_json(business_df, os.path.join(path_to_save, "cleaned_business.json"))
-        # business_df.to_json(os.path.join(path_to_save, "cleaned_business.json"), orient='records', lines=True)
+        save_json_records(business_df, os.path.join(path_to_save, "cleaned_business.json"))
 
         logging.info(f"Cleaned business data saved to {path_to_save}")
 
@@ -123,50 +153,72 @@ def clean_business():
         raise
 
 
-def handle_negations(words):
-    # Example implementation - can be refined further
-    transformed_words = []
-    negation = False
-    for word in words:
-        if negation:
-            word = 'not_' + word
-            negation = False
-        if word in ['not', 'no']:
-            negation = True
-        else:
-            transformed_words.append(word)
-    return transformed_words
+def build_category_index(categories):
+    """
+    Index the rows of a chunk by each distinct, lowercased category token.
 
+    :param categories: Series of comma-separated category strings
+    :return: dictionary mapping each category token to the index labels of the rows that carry it
+    """
+    tokens = categories.dropna().str.lower().str.split(',').explode().str.strip()
+    return tokens.index.groupby(tokens.values)
 
-def preprocess_text(text):
 
-    # Remove emojies
-    # text = emoji.demojize(text)
+def find_category_rows(category_index, category):
+    """
+    Find the rows with a category token containing the given category, like a case-insensitive
+    ``str.contains`` on the full category string.
 
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
+    :param category_index: Index built by build_category_index
+    :param category: Category to look up, e.g. 'Italian'
+    :return: index labels of the matching rows
+    """
+    category = category.lower()
+    matches = [rows for token, rows in category_index.items() if category in token]
+    if not matches:
+        return pd.Index([])
+    return matches[0].append(matches[1:]).unique()
 
-    # Replace special characters and numbers
-    text = re.sub(r'[^a-zA-Z\s]', '', text)
 
-    # Tokenization and lowercase
-    words = nltk.word_tokenize(text.lower())
+def get_partition_path(state, category):
+    category = category.lower().replace(' ', '_')
+    return get_path_from_root("data", "interim", f"cleaned_business_{state.lower()}_{category}.json")
 
-    # Stopword removal
-    stop_words = set(stopwords.words("english"))
-    words = [word for word in words if word not in stop_words]
 
-    # Negation handling
-    words = handle_negations(words)
+def partition_business(partitions=None):
+    """
+    Clean business.json for several (state, category) pairs in a single scan of the dump.
 
-    # Lemmatization
-    lemmatizer = nltk.WordNetLemmatizer()
-    words = [lemmatizer.lemmatize(word) for word in words]
-    words = [lemmatizer.lemmatize(word, pos='n') for word in words]  # Lemmatize nouns
-    words = [lemmatizer.lemmatize(word, pos='v') for word in words]  # Lemmatize verbs
+    :param partitions: List of (state, category) pairs; defaults to BUSINESS_CLEANING_CONFIG['partitions']
+    """
+    try:
+        partitions = partitions or BUSINESS_CLEANING_CONFIG['partitions']
+        states = {state for state, _ in partitions}
+        matched_chunks = {partition: [] for partition in partitions}
+
+        for chunk in get_business_df(stream=True, filters=[('state', 'in', states)]):
+            # Tokenize the categories once per chunk and answer every requested category from the index
+            category_index = build_category_index(chunk['categories'])
+            state_rows = chunk.index.groupby(chunk['state'].values)
+
+            for state, category in partitions:
+                rows = find_category_rows(category_index, category).intersection(state_rows.get(state, pd.Index([])))
+                if len(rows):
+                    matched_chunks[(state, category)].append(chunk[chunk.index.isin(rows)])
+
+        for (state, category), chunks in matched_chunks.items():
+            if not chunks:
+                logging.info(f"No businesses found for {category} in {state}")
+                continue
+
+            business_df = clean_business_df(pd.concat(chunks, ignore_index=True))
+            path_to_save = get_partition_path(state, category)
+            save_json_records(business_df, path_to_save)
+            logging.info(f"Cleaned business data for {category} in {state} saved to {path_to_save}")
 
-    # Rejoin words into a string
-    return " ".join(words)
+    except Exception as e:
+        logging.error(f"Error in partition_business: {e}")
+        raise
 
 
 def clean_reviews_chunk(chunk):
@@ -175,34 +227,81 @@ def clean_reviews_chunk(chunk):
     # Filter based on business IDs from cleaned business data
     chunk = chunk[chunk['business_id'].isin(REVIEW_CLEANING_CONFIG['business_ids'])]
 
-    # Standardize date formats and handle missing values
-    chunk.loc[:, 'date'] = pd.to_datetime(chunk['date'], errors='coerce')
+    # Standardize date formats and handle missing values; the JSON reader hands dates over as strings,
+    # so the column is replaced rather than assigned into
+    chunk['date'] = pd.to_datetime(chunk['date'], errors='coerce')
     chunk.dropna(subset=['review_id', 'user_id', 'business_id', 'date'], inplace=True)
 
     # Remove duplicates and preprocess text for sentiment analysis
     chunk.drop_duplicates(subset='review_id', inplace=True)
     chunk.loc[:, 'text'] = chunk['text'].str.lower().str.replace(r'[^\w\s]+', '')
-    chunk.loc[:, 'text'] = chunk["text"].apply(lambda x: preprocess_text(x))
+    chunk.loc[:, 'text'] = preprocess_texts(chunk["text"])
 
     return chunk
 
 
-def clean_reviews():
-    try:
-        chunks = []
+def init_review_worker(business_ids):
+    # Worker processes do not share the parent's config, so the business IDs are handed over once per worker
+    REVIEW_CLEANING_CONFIG['business_ids'] = business_ids
 
-        for chunk in pd.read_json(get_path_from_root("data", "raw", "Yelp Data", "review.json"), lines=True,
-                                  chunksize=REVIEW_CLEANING_CONFIG['chunk_size']):
-            cleaned_chunk = clean_reviews_chunk(chunk)
-            chunks.append(cleaned_chunk)
 
-        cleaned_reviews_df = pd.concat(chunks)
+def clean_reviews_batch(batch):
+    # Clean one (source offset, chunk) pair, keeping the offset so the parent can checkpoint it
+    source_offset, chunk = batch
+    return source_offset, clean_reviews_chunk(chunk)
 
-        # Save cleaned data
-        path_to_save = get_path_from_root("data", "interim", "cleaned_reviews.csv")
-        cleaned_reviews_df.to_csv(path_to_save, index=False)
 
-        logging.info(f"Cleaned review data saved to {path_to_save}")
+def clean_reviews(workers=None):
+    try:
+        source_path = get_path_from_root("data", "raw", "Yelp Data", "review.json")
+        path_to_save = get_path_from_root("data", "interim", "cleaned_reviews.csv")
+        workers = workers or REVIEW_CLEANING_CONFIG['workers']
+        business_ids = REVIEW_CLEANING_CONFIG['business_ids']
+
+        # A checkpoint is only reused by a run over the same businesses
+        params = {'business_ids': hashlib.sha1("\n".join(sorted(business_ids)).encode('utf-8')).hexdigest()}
+        checkpoint = load_checkpoint(path_to_save, source_path, params=params)
+        start = checkpoint['source_offset'] if checkpoint else 0
+        rows_written = checkpoint['rows'] if checkpoint else 0
+        if checkpoint:
+            logging.info(f"Resuming review cleaning at byte {start} with {rows_written} reviews already saved")
+
+        # Only reviews of the cleaned businesses are decoded; the rest are skipped at the byte level
+        batches = read_json_lines(source_path,
+                                  workers=REVIEW_CLEANING_CONFIG['reader_workers'],
+                                  range_bytes=REVIEW_CLEANING_CONFIG['chunk_bytes'],
+                                  key_filter=('business_id', business_ids),
+                                  start=start, with_offsets=True)
+
+        # Drop reviews already seen in an earlier chunk before they reach the expensive text processing
+        deduplicator = StreamingDeduplicator(bloom_capacity=REVIEW_CLEANING_CONFIG['dedupe_bloom_capacity'])
+        batches = ((offset, deduplicator.drop_duplicates(chunk, 'review_id')) for offset, chunk in batches)
+        batches = ((offset, chunk) for offset, chunk in batches if not chunk.empty)
+
+        # Clean the chunks in a worker pool and append each one to the output as soon as it is next in order
+        cleaned_batches = imap_ordered(clean_reviews_batch, batches, workers=workers,
+                                       initializer=init_review_worker, initargs=(business_ids,))
+
+        with open_output_for_resume(path_to_save, checkpoint) as f:
+            if checkpoint:
+                # Reviews committed before the interruption still count as seen
+                for saved in pd.read_csv(path_to_save, usecols=['review_id'], chunksize=100000):
+                    deduplicator.add(saved['review_id'])
+
+            for source_offset, cleaned_chunk in cleaned_batches:
+                cleaned_chunk.to_csv(f, index=False, header=f.tell() == 0)
+                rows_written += len(cleaned_chunk)
+
+                # Commit the chunk before recording how far into the source we got
+                f.flush()
+                os.fsync(f.fileno())
+                save_checkpoint(path_to_save, source_path, source_offset, f.tell(), params=params, rows=rows_written)
+
+        clear_checkpoint(path_to_save)
+        if rows_written == 0:
+            logging.warning(f"No reviews of the {len(business_ids)} cleaned businesses were found in {source_path}")
+        logging.info(f"Removed {deduplicator.duplicates} duplicate reviews across chunks")
+        logging.info(f"Cleaned review data ({rows_written} reviews) saved to {path_to_save}")
 
     except Exception as e:
         logging.error(f"Error in clean_reviews: {e}")
@@ -211,34 +310,42 @@ def clean_reviews():
 def clean_trips_data():
     input_path = os.path.join(get_path_from_root("data", "raw", "Transportation Data"), "Trips_by_Distance.csv")
     output_path = get_path_from_root("data", "interim")
+    state_filter = TRIPS_CLEANING_CONFIG['state_filter']
 
-    # Load the dataset
-    df = pd.read_csv(input_path)
-
-    df = df[df["State Postal Code"] == "PA"]
-
-    # Define columns to drop
+    # Define columns to drop; the state code is only read to filter on and dropped afterwards
     columns_to_drop = ['State FIPS', 'Level', 'Row ID', 'State Postal Code', 'Number of Trips >=500']
 
-    # Drop the unnecessary columns
-    df_cleaned = df.drop(columns=columns_to_drop, axis=1)
-
-    # Convert 'Date' to datetime, and set it as the index
-    df['Date'] = pd.to_datetime(df['Date'])
-    df.set_index('Date', inplace=True)
+    # Load the national dataset in chunks, parsing only the needed columns and keeping only the state's rows
+    chunks = []
+    reader = pd.read_csv(input_path, usecols=lambda col: col not in columns_to_drop or col == 'State Postal Code',
+                         dtype=TRIPS_DTYPES, chunksize=TRIPS_CLEANING_CONFIG['chunk_size'])
+    for chunk in reader:
+        chunk = chunk[chunk["State Postal Code"] == state_filter]
+        chunks.append(chunk.drop(columns=['State Postal Code']))
+    df = pd.concat(chunks, ignore_index=True)
 
     # Convert 'Date' to datetime format
     df['Date'] = pd.to_datetime(df['Date'])
 
     # Extract day of the week (0 = Monday, 6 = Sunday)
-    df['DayOfWeek'] = df['Date'].dt.dayofweek
+    df['DayOfWeek'] = df['Date'].dt.dayofweek.astype('int8')
 
     # Create a new column 'Weekday_Weekend' with 0 for weekdays and 1 for weekends
     # Assuming that weekends are Saturday (5) and Sunday (6)
-    df['Weekday_Weekend'] = df['DayOfWeek'].apply(lambda x: 1 if x >= 5 else 0)
-
-    # Save the cleaned dataset to a new file
-    df_cleaned.to_csv(os.path.join(output_path, "cleaned_transportation.csv"), index=False)
+    df['Weekday_Weekend'] = (df['DayOfWeek'] >= 5).astype('int8')
+    df['Year'] = df['Date'].dt.year.astype('int16')
+
+    # Save the cleaned dataset partitioned by county and year, so queries only read the partitions they need
+    dataset_path = os.path.join(output_path, "cleaned_transportation")
+    if os.path.isdir(dataset_path):
+        shutil.rmtree(dataset_path)
+    # State-level rows have no county, and null partition keys can't be read back, so they get their own partition;
+    # get_clean_transportation_df turns it back into a missing county
+    partitioned_df = df.assign(**{'County Name': df['County Name'].fillna(STATEWIDE_PARTITION)})
+    partitioned_df.to_parquet(dataset_path, partition_cols=['County Name', 'Year'], index=False)
+
+    # Keep the flat CSV for scripts that read it directly
+    df.to_csv(os.path.join(output_path, "cleaned_transportation.csv"), index=False)
     logger.info(f"Cleaned transportation data saved to {output_path}")
 
 
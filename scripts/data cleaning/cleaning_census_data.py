@@ -1,80 +1,99 @@
+import logging
 import os
+import re
+from functools import reduce
+from math import gcd
 
+import numpy as np
 import pandas as pd
 
+from config import CENSUS_CLEANING_CONFIG
+from scripts.utility.census_store import to_numeric_values
+from scripts.utility.parallel import get_worker_count, imap_ordered
 from scripts.utility.path_utils import get_path_from_root
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
-def clean_census_data(input_path, output_path):
-    input_path = input_path
-    output_path = output_path
+# Separator between the levels of a "Label (Grouping)" hierarchy
+HIERARCHY_SEPARATOR = ' -> '
 
-    # Read the CSV file
-    df = pd.read_csv(input_path, low_memory=False)
+# Characters the census exports indent labels with
+INDENT_CHARACTERS = ' \xa0'
+
+# Estimate columns of a ZCTA, e.g. 'ZCTA5 15001!!Estimate' or 'ZCTA5 15001!!Households!!Estimate'
+ESTIMATE_COLUMN_PATTERN = re.compile(r'ZCTA5 (?P<zip>\d{5})!!(?:(?P<group>.+)!!)?Estimate$')
 
-    # Process initial hierarchical structure
-    def count_leading_spaces(value):
-        if isinstance(value, str):
-            return len(value) - len(value.lstrip(' '))
-        else:
-            return 0
 
-    df['IndentLevel'] = df['Label (Grouping)'].apply(count_leading_spaces)
+def count_indent_levels(labels):
+    """
+    Get the indent level of each label, counting indentation in units of the narrowest indent used.
 
-    max_indent = df['IndentLevel'].max()
-    for level in range(max_indent + 1):
-        df[f'Level_{level}'] = None
-        mask = df['IndentLevel'] == level
-        df.loc[mask, f'Level_{level}'] = df.loc[mask, 'Label (Grouping)'].str.strip()
+    :param labels: Series of "Label (Grouping)" values
+    :return: integer array with the indent level of each label
+    """
+    labels = labels.fillna('').astype(str)
+    indents = (labels.str.len() - labels.str.lstrip(INDENT_CHARACTERS).str.len()).to_numpy()
+    unit = reduce(gcd, np.unique(indents[indents > 0]).tolist(), 0) or 1
+    return indents // unit
 
-    for level in range(max_indent + 1):
-        df[f'Level_{level}'] = df[f'Level_{level}'].ffill()
 
-    df.drop(columns=['Label (Grouping)'], inplace=True)
+def build_hierarchy(labels, separator=HIERARCHY_SEPARATOR):
+    """
+    Build the full path of every label in an indented "Label (Grouping)" column.
 
-    # Update 'Level_0' to represent the hierarchy
-    def update_hierarchy_column(df):
-        current_path = []  # Initialize an empty list to store the current hierarchy path
-        hierarchy = []  # Initialize an empty list to store the final hierarchy for each row
+    Each label is nested under the closest preceding label with a smaller indent, like an indent
+    stack, but computed for all rows at once.
 
-        for index, row in df.iterrows():
-            label = row['Level_0']
-            indent_level = row['IndentLevel']
+    :param labels: Series of "Label (Grouping)" values
+    :param separator: String joining the levels of a path
+    :return: tuple of the path of each label, and a DataFrame with the label in effect at each depth
+    """
+    levels = count_indent_levels(labels)
+    names = labels.fillna('').astype(str).str.strip(INDENT_CHARACTERS).reset_index(drop=True)
 
-            # Truncate the current_path list to the current indent_level
-            current_path = current_path[:indent_level]
+    # Depth of each row on the stack: one below the shallower of its indent and the depth above it,
+    # i.e. depth[i] = min(depth[i-1] + 1, level[i]), unrolled into a running minimum
+    rows = np.arange(len(levels))
+    depths = rows + np.minimum(0, np.minimum.accumulate(levels - rows))
 
-            if indent_level == 0 and label.isupper():  # Major category
-                current_path = [label]  # Start a new path
-            elif label.endswith(':'):  # Subcategory
-                if len(current_path) > indent_level:
-                    current_path[indent_level] = label  # Replace at the current indent level
-                else:
-                    current_path.append(label)  # Append to the current path
-            else:  # Continuation of the current hierarchy
-                if len(current_path) > indent_level:
-                    current_path[indent_level] = label  # Replace at the current indent level
-                else:
-                    current_path.append(label)  # Append if empty or extend the path
+    # The label at each depth is the last one pushed at that depth
+    depth_labels = pd.DataFrame({f'Level_{depth}': names.where(depths == depth).ffill()
+                                 for depth in range(depths.max() + 1)})
 
-            hierarchy.append(' -> '.join(current_path))
+    # Join the labels of every row's path one depth at a time
+    hierarchy = depth_labels['Level_0']
+    for depth in range(1, depth_labels.shape[1]):
+        hierarchy = hierarchy.where(depths < depth, hierarchy + separator + depth_labels[f'Level_{depth}'])
 
-        df['Level_0'] = hierarchy
-        return df
+    hierarchy.index = labels.index
+    depth_labels.index = labels.index
+    return hierarchy, depth_labels
 
-    df = update_hierarchy_column(df)
 
-    # Standardize ZIP code column names
-    def standardize_zip_code_columns(df):
-        for col in df.columns:
-            if 'ZCTA5' in col and '!!Estimate' in col:
-                new_col_name = col.split()[1]  # Extracting the ZIP code
-                df.rename(columns={col: new_col_name}, inplace=True)
+def standardize_zip_code_columns(columns):
+    """
+    Rename the 'ZCTA5 <ZIP>!!Estimate' columns to their ZIP code and drop '!!Estimate' from the others.
 
-        df.columns = [col.replace("!!Estimate", "") for col in df.columns]
-        return df
+    :param columns: Column names of a census table
+    :return: list of standardized column names
+    """
+    return [(col.split()[1] if 'ZCTA5' in col and '!!Estimate' in col else col).replace("!!Estimate", "")
+            for col in columns]
 
-    df = standardize_zip_code_columns(df)
+
+def clean_census_data(input_path, output_path):
+    # Read the CSV file
+    df = pd.read_csv(input_path, low_memory=False)
+
+    # Rebuild the hierarchy of the indented labels, keeping the label in effect at each level
+    hierarchy, depth_labels = build_hierarchy(df['Label (Grouping)'])
+    df['IndentLevel'] = count_indent_levels(df['Label (Grouping)'])
+    df = df.drop(columns=['Label (Grouping)']).join(depth_labels)
+    df['Level_0'] = hierarchy
+
+    # Standardize ZIP code column names in a single pass
+    df.columns = standardize_zip_code_columns(df.columns)
 
     # Drop redundant columns
     columns_to_drop = [col for col in df.columns if 'Margin of Error' in col or 'Percent' in col]
@@ -84,19 +103,76 @@ def clean_census_data(input_path, output_path):
     df.to_csv(output_path, index=False)
 
 
+def build_zip_matrix(df):
+    """
+    Turn a census table into a ZIP-by-variable matrix of float32 estimates.
+
+    Variables are named by their label hierarchy, followed by the estimate group for subject tables
+    that report several estimates per ZIP code (e.g. 'Households'). Margins of error and percentages
+    are left out.
+
+    :param df: Raw census table with a "Label (Grouping)" column and one column per ZCTA estimate
+    :return: DataFrame indexed by ZIP code with one float32 column per variable
+    """
+    hierarchy, _ = build_hierarchy(df['Label (Grouping)'])
+
+    # Repeated paths get a counter so every variable name is unique
+    repeats = hierarchy.groupby(hierarchy).cumcount()
+    variables = hierarchy.where(repeats == 0, hierarchy + ' #' + (repeats + 1).astype(str)).tolist()
+
+    estimates = df.columns.str.extract(ESTIMATE_COLUMN_PATTERN)
+    estimates['column'] = df.columns
+    estimates = estimates.dropna(subset=['zip'])
+    estimates = estimates[~estimates['group'].fillna('').str.contains('Percent')]
+
+    # Convert the whole block at once and lay it out with ZIP codes as rows
+    values = to_numeric_values(df[estimates['column']].to_numpy()).T
+    groups = estimates['group'].fillna('')
+    index = pd.MultiIndex.from_arrays([estimates['zip'], groups], names=['ZIP_CODE', 'group'])
+    matrix = pd.DataFrame(values, index=index, columns=variables)
+
+    # Subject tables have one block of estimates per group; give each group its own set of variables
+    if (groups != '').any():
+        matrix = matrix.unstack('group').reindex(columns=pd.MultiIndex.from_product([variables, groups.unique()]))
+        matrix.columns = [variable + HIERARCHY_SEPARATOR + group if group else variable
+                          for variable, group in matrix.columns]
+    else:
+        matrix = matrix.droplevel('group')
+    return matrix
+
+
+def clean_census_table(task):
+    # Clean one table into a typed ZIP-by-variable matrix; runs in a worker process
+    name, input_path, output_path = task
+    df = pd.read_csv(input_path, dtype=str, keep_default_na=False)
+    matrix = build_zip_matrix(df)
+    matrix.reset_index().to_parquet(output_path, index=False)
+    return name, matrix.shape
+
+
+def clean_census_tables(tables=None, workers=None):
+    """
+    Clean several census tables in parallel, writing one Parquet ZIP-by-variable matrix per table.
+
+    :param tables: Mapping of table name to raw file name (default: CENSUS_CLEANING_CONFIG['tables'])
+    :param workers: Number of worker processes, or None for the configured default
+    """
+    tables = tables or CENSUS_CLEANING_CONFIG['tables']
+    workers = workers if workers is not None else CENSUS_CLEANING_CONFIG['workers']
+
+    input_dir = get_path_from_root("data", "raw", "Census Bureau Data")
+    output_dir = get_path_from_root("data", "interim", "census")
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = [(name, os.path.join(input_dir, file_name), os.path.join(output_dir, f"{name.lower()}.parquet"))
+             for name, file_name in tables.items()]
+    workers = min(len(tasks), get_worker_count(workers))
+    for name, shape in imap_ordered(clean_census_table, tasks, workers=workers):
+        logger.info(f"Cleaned {name}: {shape[0]} ZIP codes x {shape[1]} variables")
+
+
 def main():
-    input_paths = {
-        "DP04": os.path.join(get_path_from_root("data", "raw", "Census Bureau Data"), "DP04.csv"),
-        "DP05": os.path.join(get_path_from_root("Data", "raw", "Census Bureau Data"), "DP05.csv")
-    }
-
-    output_paths = {
-        "DP04": os.path.join(get_path_from_root("data", "interim"), "cleaned_dp04.csv"),
-        "DP05": os.path.join(get_path_from_root("Data", "interim"), "cleaned_dp05.csv")
-    }
-
-    clean_census_data(os.path.join(get_path_from_root("data", "raw", "Census Bureau Data"), "DP04.csv"),
-                      os.path.join(get_path_from_root("data", "interim"), "cleaned_dp04.csv"))
+    clean_census_tables()
 
 
 if __name__ == "__main__":
@@ -1,34 +1,26 @@
 import pandas as pd
 
+from scripts.utility.business_attributes import compact_business_dtypes, decode_attributes, save_dtype_schema
+
 
 # Call the function to load the data
 # df = get_business_df()
 
 
-# Function to safely evaluate a string representation of a dictionary
-def safe_eval_dict(d):
-    try:
-        return eval(d)
-    except:
-        return {}
-
-
 def flatten(df):
     # Check if the DataFrame needs normalization
-    if any(df.map(lambda x: isinstance(x, dict)).any()):
-        # Normalize the 'attributes' and 'hours' columns
-        attributes_df = pd.json_normalize(df['attributes'].dropna().tolist()).add_prefix('attributes_')
-        hours_df = pd.json_normalize(df['hours'].dropna().tolist()).add_prefix('hours_')
-
-        # Further normalize specific keys within 'attributes'
-        for key in ['GoodForMeal', 'BusinessParking', 'Ambience']:
-            # Extract and normalize the nested dictionaries
-            nested_df = pd.json_normalize(attributes_df[f'attributes_{key}'].dropna().apply(safe_eval_dict)).add_prefix(
-                f'{key}_')
-            # Drop the original column from attributes_df
-            attributes_df = attributes_df.drop(columns=[f'attributes_{key}'])
-            # Merge the normalized dataframes back into the attributes_df
-            attributes_df = attributes_df.join(nested_df, how='left')
+    if any(df[col].map(lambda x: isinstance(x, dict)).any() for col in ['attributes', 'hours'] if col in df.columns):
+        # Decode the 'attributes' column into typed columns, including the nested GoodForMeal, BusinessParking,
+        # Ambience, ... sub-attributes
+        attributes_df = decode_attributes(df['attributes'])
+
+        # clean_business_df already decodes the attributes; keep those columns rather than adding them twice
+        attributes_df = attributes_df.drop(columns=attributes_df.columns.intersection(df.columns))
+        attributes_df = attributes_df.add_prefix('attributes_')
+
+        # Normalize the 'hours' column, keeping rows aligned with the businesses they belong to
+        hours_df = pd.DataFrame([hours if isinstance(hours, dict) else {} for hours in df['hours']],
+                                index=df.index).add_prefix('hours_')
 
         # Drop the original 'attributes' and 'hours' columns from df
         df = df.drop(columns=['attributes', 'hours'])
@@ -39,4 +31,7 @@ def flatten(df):
         # Remove 'attributes_' prefix from column names
         df.columns = [col.replace('attributes_', '') for col in df.columns]
 
+        # Store attributes as nullable booleans, categories and small ints, and persist the dtypes for reloads
+        df = compact_business_dtypes(df)
         df.to_csv("flattened_business.csv", index=False)
+        save_dtype_schema(df, "flattened_business.csv")
@@ -1,9 +1,9 @@
 import os
 
 import pandas as pd
-from textblob import TextBlob
 
 from scripts.utility.path_utils import get_path_from_root
+from scripts.utility.sentiment import categorize_polarity, get_polarity
 
 pd.set_option("display.max_rows", 200)
 pd.set_option("display.max_columns", 200)
@@ -26,27 +26,9 @@ merged_data = review_df.merge(
 )
 
 
-# Function to perform sentiment analysis on the text and categorize it
-def perform_sentiment_analysis(text):
-    # Handle missing or non-string text
-    if pd.isna(text) or not isinstance(text, str):
-        return 0, 'neutral'  # Neutral sentiment for missing or non-string text
-
-    # Get the polarity score using TextBlob
-    polarity = TextBlob(text).sentiment.polarity
-    # Categorize the polarity into sentiment categories
-    if polarity > 0.2:
-        return polarity, 'positive'
-    elif polarity < -0.2:
-        return polarity, 'negative'
-    else:
-        return polarity, 'neutral'
-
-
-# Perform sentiment analysis and categorize
-results = merged_data['text'].apply(perform_sentiment_analysis)
-merged_data['sentiment'] = results.apply(lambda x: x[0])
-merged_data['sentiment_category'] = results.apply(lambda x: x[1])
+# Score the reviews once through the shared, cached scorer and categorize the polarities
+merged_data['sentiment'] = get_polarity(merged_data)
+merged_data['sentiment_category'] = categorize_polarity(merged_data['sentiment'])
 
 # Displaying the first few rows of the merged dataframe to check the merge and sentiment analysis
 merged_data.to_csv(os.path.join(get_path_from_root("data", "interim"), "business_x_review.csv"),
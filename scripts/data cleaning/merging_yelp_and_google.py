@@ -1,57 +1,31 @@
-import re
+import os
 
 import pandas as pd
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
-
-
-# Function to perform fuzzy matching
-def fuzzy_match(x, choices, scorer, cutoff):
-    match, score = process.extractOne(x, choices, scorer=scorer)
-    return match if score >= cutoff else None
-
-
-def normalize_and_clean(text):
-    if pd.isna(text):
-        return ""
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
 
+from scripts.utility.data_loader import get_clean_business_df
+from scripts.utility.entity_matching import MATCH_CUTOFF, update_match_table
+from scripts.utility.path_utils import get_path_from_root
 
 # Load datasets
-yelp_business_path = 'path_to_yelp_business.csv'
-google_business_path = 'path_to_google_business.csv'
+google_business_path = get_path_from_root("data", "interim", "cleaned_google_business.csv")
 yelp_review_path = 'path_to_yelp_review.csv'
 google_review_path = 'path_to_google_review.csv'
 
-yelp_business_df = pd.read_csv(yelp_business_path)
-google_business_df = pd.read_csv(google_business_path)
+yelp_business_df = get_clean_business_df(columns=['business_id', 'name', 'ZIP Code', 'latitude', 'longitude'])
+google_business_df = pd.read_csv(google_business_path).drop_duplicates(subset=['gmap_id'])
 yelp_review_df = pd.read_csv(yelp_review_path)
 google_review_df = pd.read_csv(google_review_path)
 
-# Apply normalization and cleaning to business names and addresses
-yelp_business_df['name'] = yelp_business_df['name'].apply(normalize_and_clean)
-yelp_business_df['address'] = yelp_business_df['address'].apply(normalize_and_clean)
-yelp_business_df['city'] = yelp_business_df['city'].apply(normalize_and_clean)
-yelp_business_df['ZIP Code'] = yelp_business_df['ZIP Code'].apply(normalize_and_clean)
-
-google_business_df['name'] = google_business_df['name'].apply(normalize_and_clean)
-google_business_df['city'] = google_business_df['city'].apply(normalize_and_clean)
-google_business_df['ZIP Code'] = google_business_df['ZIP Code'].apply(normalize_and_clean)
-
-# Fuzzy matching businesses
-# Note: Adjust 'scorer' and 'cutoff' based on desired accuracy
-yelp_business_df['matched_gmap_id'] = yelp_business_df['name'].apply(
-    lambda x: fuzzy_match(x, google_business_df['name'].tolist(), fuzz.token_sort_ratio, 70)
-)
+# Bring the persisted Yelp-Google match table up to date; only new or changed businesses, and the ones
+# whose candidate blocks changed, are scored again
+match_table_path = os.path.join(get_path_from_root("data", "interim"), "yelp_google_match_table.parquet")
+match_table = update_match_table(yelp_business_df, google_business_df, match_table_path)
 
-# Map the matched name to its gmap_id in Google business data
-mapping_df = yelp_business_df[['business_id', 'matched_gmap_id']]
-mapping_df = mapping_df.merge(google_business_df[['name', 'gmap_id']], left_on='matched_gmap_id', right_on='name', how='left')
-mapping_df = mapping_df[['business_id', 'gmap_id']].rename(columns={'gmap_id': 'matched_gmap_id'})
-mapping_df = mapping_df.dropna()
+# Keep the matches that reach the cutoff
+# Note: Adjust MATCH_CUTOFF based on desired accuracy
+mapping_df = match_table[match_table['score'] >= MATCH_CUTOFF]
+mapping_df = mapping_df[['business_id', 'gmap_id', 'score']].rename(columns={'gmap_id': 'matched_gmap_id'})
+mapping_df.to_csv(os.path.join(get_path_from_root("data", "interim"), "yelp_google_matches.csv"), index=False)
 
 
 # Combine both review datasets
@@ -1,36 +1,29 @@
 import os
 
 import pandas as pd
-from geopy.exc import GeocoderTimedOut
-from geopy.geocoders import Nominatim
-from tqdm import tqdm
 
+from scripts.utility.geocoding import Geocoder
 from scripts.utility.path_utils import get_path_from_root
-
-
-def get_postcode(lat, lon):
-    geolocator = Nominatim(user_agent="mangiaMetrics")
-    try:
-        location = geolocator.reverse((lat, lon), exactly_one=True)
-        if location:
-            return location.raw.get('address', {}).get('postcode')
-    except GeocoderTimedOut:
-        return None
+from scripts.utility.reverse_geocoder import reverse_geocode_zip_codes
 
 
 def main():
     # Load your dataset
     path = os.path.join(get_path_from_root("data", "interim"), "flattened_gis.csv")
-    df = pd.read_csv(path)
+    df = pd.read_csv(path, dtype={'ZIP_CODE': str})
+
+    # Fill missing ZIP codes from the ZIP code area each restaurant lies in
+    missing = df['ZIP_CODE'].isna() & df['latitude'].notna() & df['longitude'].notna()
+    df.loc[missing, 'ZIP_CODE'] = reverse_geocode_zip_codes(df.loc[missing, 'latitude'], df.loc[missing, 'longitude'])
 
-    # Iterate over DataFrame rows and fill missing postcodes
-    for index, row in tqdm(df.iterrows(), total=df.shape[0]):
-        if pd.isna(row['addr:postcode']) and pd.notna(row['latitude']) and pd.notna(row['longitude']):
-            postcode = get_postcode(row['latitude'], row['longitude'])
-            df.at[index, 'addr:postcode'] = postcode
+    # Ask the online geocoder only about points outside every ZIP code area; results are cached on disk
+    missing = df['ZIP_CODE'].isna() & df['latitude'].notna() & df['longitude'].notna()
+    if missing.any():
+        zip_codes = Geocoder().reverse_zip_codes(df.loc[missing, 'latitude'], df.loc[missing, 'longitude'])
+        df.loc[missing, 'ZIP_CODE'] = zip_codes
 
     # Save the updated DataFrame
-    df.to_csv("updated_flattened_gis.csv", index=False)
+    df.to_csv(os.path.join(get_path_from_root("data", "interim"), "updated_flattened_gis.csv"), index=False)
 
 
 if __name__ == '__main__':
@@ -4,18 +4,18 @@ from collections import Counter
 
 import matplotlib.pyplot as plt
 import pandas as pd
-from textblob import TextBlob
 from wordcloud import WordCloud
 
 from scripts.utility.data_loader import get_clean_review_df
 from scripts.utility.path_utils import get_path_from_root
+from scripts.utility.sentiment import get_polarity
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 def sentiment_analysis(reviews):
-    reviews["sentiment"] = reviews["text"].apply(lambda x: TextBlob(x).sentiment.polarity)
+    reviews["sentiment"] = get_polarity(reviews)
     reviews["sentiment_category"] = pd.cut(reviews["sentiment"], bins=3, labels=["negative", "neutral", "positive"])
     return reviews
 
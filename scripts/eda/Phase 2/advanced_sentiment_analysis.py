@@ -11,7 +11,9 @@ import seaborn as sns
 from nltk.sentiment import SentimentIntensityAnalyzer
 import nltk
 
+from scripts.utility.keyword_matcher import BATCH_SIZE, KeywordAutomaton
 from scripts.utility.path_utils import get_path_from_root
+from scripts.utility.text_processing import preprocess_texts
 
 # nltk.download('vader_lexicon')
 output_path = get_path_from_root("results", "eda", "Phase 2", "sentiment_analysis")
@@ -125,13 +127,10 @@ def analyze_sentiment_vader(reviews):
 
 
 def plot_sarcasm_detection(reviews, sarcastic_keywords, file_name="sarcasm_detection.png"):
-    sarcasm_counts = {'Sarcastic': 0, 'Non-Sarcastic': 0}
-
-    for review in reviews:
-        if detect_sarcasm(review, sarcastic_keywords):
-            sarcasm_counts['Sarcastic'] += 1
-        else:
-            sarcasm_counts['Non-Sarcastic'] += 1
+    # A review is sarcastic when it contains at least one cue
+    cue_counts = detect_sarcasm(reviews, sarcastic_keywords)
+    sarcastic = int(np.count_nonzero(cue_counts))
+    sarcasm_counts = {'Sarcastic': sarcastic, 'Non-Sarcastic': len(cue_counts) - sarcastic}
 
     plt.figure(figsize=(6, 6))
     plt.pie(sarcasm_counts.values(), labels=sarcasm_counts.keys(), autopct='%1.1f%%', startangle=140)
@@ -140,20 +139,23 @@ def plot_sarcasm_detection(reviews, sarcastic_keywords, file_name="sarcasm_detec
     plt.savefig(os.path.join(output_path, file_name))
     plt.show()
 
+    return cue_counts
 
-def detect_sarcasm(text, sarcastic_keywords):
-    words = text.split()
-    for word in words:
-        if word in sarcastic_keywords:
-            return True
-    return False
 
+def detect_sarcasm(reviews, sarcastic_keywords, batch_size=BATCH_SIZE):
+    # The reviews were cleaned with preprocess_text, so the cues are cleaned the same way ('thanks a lot' becomes
+    # 'thank lot'); cues made only of stopwords are dropped and cues that clean to the same words count once
+    cues = [cue for cue in dict.fromkeys(preprocess_texts(sarcastic_keywords)) if cue]
+
+    # Count the cues in every review, phrases such as 'yeah right' included, in one pass over its tokens
+    cue_counts = KeywordAutomaton(cues).count_matrix(reviews, batch_size=batch_size)
+    return cue_counts.sum(axis=1)
 
-def plot_aspect_sentiment(aspect_sentiments, file_name="aspect_sentiment.png"):
-    average_sentiments = {aspect: np.mean(sentiments) for aspect, sentiments in aspect_sentiments.items() if sentiments}
 
-    # Sort aspects by sentiment score for better visualization
-    sorted_aspects = dict(sorted(average_sentiments.items(), key=lambda item: item[1], reverse=True))
+def plot_aspect_sentiment(aspect_sentiments, file_name="aspect_sentiment.png"):
+    # Sort the mentioned aspects by sentiment score for better visualization
+    average_sentiments = aspect_sentiments['mean_compound'].dropna()
+    sorted_aspects = average_sentiments.sort_values(ascending=False).to_dict()
 
     # Determine the figure size dynamically based on the number of aspects
     fig_width = max(10, len(sorted_aspects) * 0.5)
@@ -185,16 +187,24 @@ def plot_aspect_sentiment(aspect_sentiments, file_name="aspect_sentiment.png"):
 
 
 def analyze_aspect_sentiment(reviews, aspect_keywords):
-    analyzer = SentimentIntensityAnalyzer()
-    aspect_sentiments = {aspect: [] for aspect in aspect_keywords}
+    # The reviews were cleaned with preprocess_text, so the aspects are cleaned the same way (e.g. 'seating'
+    # becomes 'seat') before finding the ones each review mentions in a single pass over its tokens
+    reviews = list(reviews)
+    mentioned = KeywordAutomaton(preprocess_texts(aspect_keywords)).count_matrix(reviews) > 0
 
-    for review in reviews:
-        for aspect in aspect_keywords:
-            if aspect in review:
-                score = analyzer.polarity_scores(review)
-                aspect_sentiments[aspect].append(score['compound'])  # Using compound score for overall sentiment
-
-    return aspect_sentiments
+    # Score each review mentioning any aspect once, using the compound score for overall sentiment
+    analyzer = SentimentIntensityAnalyzer()
+    compound = np.zeros(len(reviews))
+    for position in np.flatnonzero(mentioned.any(axis=1)):
+        compound[position] = analyzer.polarity_scores(reviews[position])['compound']
+
+    # Aggregate the scores of the reviews mentioning each aspect
+    mentions = mentioned.sum(axis=0)
+    totals = compound @ mentioned
+    return pd.DataFrame({
+        'mentions': mentions,
+        'mean_compound': np.divide(totals, mentions, out=np.full(len(mentions), np.nan), where=mentions > 0),
+    }, index=pd.Index(aspect_keywords, name='aspect'))
 
 
 def main(cleaned_reviews_path):
@@ -4,7 +4,6 @@ from datetime import datetime
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
-from textblob import TextBlob
 
 from scripts.utility.path_utils import get_path_from_root
 
@@ -33,23 +32,6 @@ def apply_time_decay(merged_data):
     return merged_data
 
 
-# Function to perform sentiment analysis on the text and categorize it
-def perform_sentiment_analysis(text):
-    # Handle missing or non-string text
-    if pd.isna(text) or not isinstance(text, str):
-        return 0, 'neutral'  # Neutral sentiment for missing or non-string text
-
-    # Get the polarity score using TextBlob
-    polarity = TextBlob(text).sentiment.polarity
-    # Categorize the polarity into sentiment categories
-    if polarity > 0.2:
-        return polarity, 'positive'
-    elif polarity < -0.2:
-        return polarity, 'negative'
-    else:
-        return polarity, 'neutral'
-
-
 def main():
     path = os.path.join(get_path_from_root("data", "interim"), "business_x_review.csv")
     merged_data = pd.read_csv(path)
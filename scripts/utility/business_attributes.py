@@ -0,0 +1,194 @@
+import ast
+import functools
+import json
+import os
+
+import pandas as pd
+
+# Constants
+ATTRIBUTE_CACHE_SIZE = 2 ** 16  # Upper bound on the number of distinct raw attribute strings memoized
+
+
+@functools.lru_cache(maxsize=ATTRIBUTE_CACHE_SIZE)
+def decode_attribute_value(raw):
+    """
+    Decode one raw Yelp attribute value such as "True", "u'casual'", "2" or "{'garage': False, ...}".
+
+    The result is memoized and shared between callers, so it must not be modified.
+
+    :param raw: Raw attribute string
+    :return: decoded Python value (bool, int, str, dict or None); unparseable strings are returned as-is
+    """
+    try:
+        return ast.literal_eval(raw)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return raw
+
+
+def _to_raw_string(value):
+    # Attributes that were already decoded (e.g. nested dicts in a cleaned JSON) are turned back into
+    # their literal form so that every distinct value can be hashed and decoded once
+    return value if isinstance(value, str) else repr(value)
+
+
+def _smallest_int_dtype(values):
+    for dtype, info in (('Int8', 127), ('Int16', 32767), ('Int32', 2 ** 31 - 1)):
+        if values.abs().max() <= info:
+            return dtype
+    return 'Int64'
+
+
+def compact_attribute_column(values):
+    """
+    Convert a column of decoded attribute values to a compact dtype.
+
+    Booleans become the nullable 'boolean' dtype, integers the smallest nullable integer dtype, and
+    anything else a 'category' of strings.
+
+    :param values: Series of decoded values, with None/NaN for missing
+    :return: Series with a compact dtype
+    """
+    non_null = values.dropna()
+    kinds = {type(value) for value in non_null}
+    if kinds <= {bool}:
+        return values.astype('boolean')
+    if kinds <= {int}:
+        return values.astype(_smallest_int_dtype(non_null.astype('int64')))
+    return values.where(values.isna(), values.astype(str)).astype('category')
+
+
+def decode_attributes(attributes, sep='_'):
+    """
+    Decode a column of Yelp attribute dictionaries into a typed, wide attribute matrix.
+
+    The schema (top-level keys, and sub-keys of nested attributes such as BusinessParking) is inferred
+    once from the data, and each distinct raw value is decoded only once. Nested attributes become
+    ``<key><sep><sub-key>`` columns.
+
+    :param attributes: Series of attribute dictionaries (or None) per business
+    :param sep: Separator between a nested attribute and its sub-key
+    :return: DataFrame indexed like ``attributes`` with one compactly typed column per attribute
+    """
+    # Long form: one (row, key, raw value) record per attribute present on a business
+    long_df = pd.DataFrame(
+        [(label, key, _to_raw_string(raw))
+         for label, attrs in attributes.items() if isinstance(attrs, dict)
+         for key, raw in attrs.items()],
+        columns=['row', 'key', 'raw'])
+    if long_df.empty:
+        return pd.DataFrame(index=attributes.index)
+
+    # Decode each distinct raw string once and map the results back to every record
+    codes, uniques = pd.factorize(long_df['raw'])
+    decoded = [decode_attribute_value(raw) for raw in uniques]
+    is_nested = pd.Series([isinstance(value, dict) for value in decoded])
+    long_df['code'] = codes
+    long_df['nested'] = is_nested.values[codes]
+
+    # Flat attributes: the decoded value goes straight into the matrix. Keys that hold a dictionary anywhere
+    # are nested in the schema, so their scalar placeholders (e.g. "None") are dropped
+    nested_keys = long_df.loc[long_df['nested'], 'key'].unique()
+    flat_df = long_df[~long_df['nested'] & ~long_df['key'].isin(nested_keys)]
+    flat_df = flat_df.assign(column=flat_df['key'], value=pd.Series(decoded, dtype=object).values[flat_df['code']])
+
+    # Nested attributes: expand each distinct dictionary once into (sub-key, value) pairs
+    nested_items = pd.DataFrame(
+        [(code, sub_key, value)
+         for code in is_nested[is_nested].index
+         for sub_key, value in decoded[code].items()],
+        columns=['code', 'sub_key', 'value'])
+    nested_df = long_df[long_df['nested']].merge(nested_items, on='code')
+    nested_df = nested_df.assign(column=nested_df['key'] + sep + nested_df['sub_key'].astype(str))
+
+    combined = pd.concat([flat_df[['row', 'column', 'value']], nested_df[['row', 'column', 'value']]],
+                         ignore_index=True)
+    wide_df = combined.pivot(index='row', columns='column', values='value')
+
+    # Keep the columns in the order they first appear in the data rather than alphabetically
+    wide_df = wide_df.reindex(index=attributes.index, columns=pd.unique(combined['column']))
+    wide_df.columns.name = None
+    return wide_df.apply(compact_attribute_column)
+
+
+# Columns of the flattened business table that hold identifiers or free text rather than attribute values
+IDENTITY_COLUMNS = {'business_id', 'name', 'address', 'city', 'state', 'postal_code', 'ZIP Code', 'categories'}
+
+# Numeric columns that need full float64 precision
+FULL_PRECISION_COLUMNS = {'latitude', 'longitude'}
+
+
+def _decode_column(values):
+    # Decode each distinct string once; codes of -1 (missing) pick the trailing None
+    codes, uniques = pd.factorize(values)
+    decoded = [decode_attribute_value(value) if isinstance(value, str) else value for value in uniques]
+    decoded = pd.Series(decoded + [None], dtype=object).values
+    return pd.Series(decoded[codes], index=values.index, dtype=object)
+
+
+def compact_business_dtypes(df):
+    """
+    Convert a flattened business table to compact dtypes.
+
+    Attribute columns stored as strings such as 'True', "u'casual'" or 'None' become nullable boolean,
+    small integer or categorical columns, ``hours_*`` columns become categorical, integer columns are
+    downcast and floats (other than coordinates) become float32.
+
+    :param df: Flattened business DataFrame
+    :return: new DataFrame with compact dtypes
+    """
+    df = df.copy()
+
+    # Columns are visited by position, so a table with repeated column names is still converted column by column
+    for position, col in enumerate(df.columns):
+        values = df.iloc[:, position]
+        if col in IDENTITY_COLUMNS or isinstance(values.dtype, pd.CategoricalDtype) \
+                or pd.api.types.is_bool_dtype(values):
+            continue
+
+        if col.startswith('hours_'):
+            df.isetitem(position, values.astype('category'))
+        elif pd.api.types.is_integer_dtype(values):
+            df.isetitem(position, pd.to_numeric(values, downcast='integer'))
+        elif pd.api.types.is_float_dtype(values):
+            if col not in FULL_PRECISION_COLUMNS:
+                df.isetitem(position, values.astype('float32'))
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            df.isetitem(position, compact_attribute_column(_decode_column(values)))
+    return df
+
+
+def get_schema_path(csv_path):
+    """
+    Get the path of the dtype schema persisted next to a CSV file.
+
+    :param csv_path: Path to the CSV file
+    :return: path to the JSON schema file
+    """
+    return os.path.splitext(csv_path)[0] + ".schema.json"
+
+
+def save_dtype_schema(df, csv_path):
+    """
+    Persist the compact dtypes of a DataFrame next to the CSV it was saved to, so reloads can restore them.
+
+    :param df: DataFrame that was written to ``csv_path``
+    :param csv_path: Path to the CSV file
+    """
+    schema = {col: str(dtype) for col, dtype in df.dtypes.items()
+              if str(dtype) not in ('object', 'str', 'string', 'float64')}
+    with open(get_schema_path(csv_path), 'w') as f:
+        json.dump(schema, f, indent=4)
+
+
+def load_dtype_schema(csv_path):
+    """
+    Load the dtype schema persisted next to a CSV file.
+
+    :param csv_path: Path to the CSV file
+    :return: dictionary of column name to dtype, or None if no schema was saved
+    """
+    schema_path = get_schema_path(csv_path)
+    if not os.path.exists(schema_path):
+        return None
+    with open(schema_path, 'r') as f:
+        return json.load(f)
@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.utility.path_utils import get_file_fingerprint, get_path_from_root
+
+logger = logging.getLogger(__name__)
+
+# Census tables in data/final that make up the store
+CENSUS_TABLES = ('dp03', 'dp04', 'dp05')
+
+# Separator between the levels of a census label, e.g. 'Housing Occupancy - Total housing units'
+LABEL_SEPARATOR = ' - '
+
+# Trailing wildcard that selects every label below a prefix, e.g. 'Housing Occupancy - *'
+WILDCARD = '*'
+
+# Thousands separators and the open-ended markers of values such as '250,000+' or '2,500-'
+NUMERIC_NOISE_PATTERN = r',|\+$|(?<=\d)-$'
+
+
+def to_numeric_values(values):
+    """
+    Convert census estimates such as '1,234', '250,000+' or '(X)' to float32, with NaN where there is no number.
+
+    :param values: 2D array of raw estimates
+    :return: float32 array of the same shape
+    """
+    flat = pd.Series(np.asarray(values, dtype=object).ravel(), dtype=object).astype(str)
+    numbers = pd.to_numeric(flat.str.replace(NUMERIC_NOISE_PATTERN, '', regex=True), errors='coerce')
+    return numbers.to_numpy(dtype='float32').reshape(np.shape(values))
+
+
+class _TrieNode:
+    __slots__ = ('children', 'index', 'start', 'stop')
+
+    def __init__(self):
+        self.children = {}
+        self.index = None  # Column of the label ending at this node, if any
+        self.start = self.stop = 0  # Range of columns in this node's subtree
+
+
+class LabelTrie:
+    """
+    Prefix trie over hierarchical labels, split on their level separator.
+
+    Columns are laid out in the trie's depth-first order, so every subtree is a contiguous range of
+    columns and selecting it is a slice rather than a scan over the labels.
+    """
+
+    def __init__(self, labels, separator=LABEL_SEPARATOR):
+        self.separator = separator
+        self.root = _TrieNode()
+        for index, label in enumerate(labels):
+            node = self.root
+            for part in label.split(separator):
+                node = node.children.setdefault(part, _TrieNode())
+            node.index = index
+
+        # Number the labels depth-first, recording the column range of each subtree
+        self.order = []
+        stack = [(self.root, False)]
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                node.stop = len(self.order)
+                continue
+            node.start = len(self.order)
+            if node.index is not None:
+                self.order.append(node.index)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(list(node.children.values())))
+
+    def _find(self, prefix):
+        node = self.root
+        for part in prefix.split(self.separator):
+            node = node.children.get(part)
+            if node is None:
+                raise KeyError(prefix)
+        return node
+
+    def __contains__(self, label):
+        try:
+            return self._find(label).index is not None
+        except KeyError:
+            return False
+
+    def columns(self, pattern):
+        """
+        Get the column range of a label, or of every label below a prefix ending in the wildcard.
+
+        :param pattern: Full label, or a prefix of whole levels followed by ' - *'
+        :return: slice of column positions, in depth-first order
+        """
+        wildcard = self.separator + WILDCARD
+        if pattern.endswith(wildcard):
+            node = self._find(pattern[:-len(wildcard)])
+            return slice(node.start + (node.index is not None), node.stop)
+        node = self._find(pattern)
+        if node.index is None:
+            raise KeyError(pattern)
+        return slice(node.start, node.start + 1)
+
+
+class CensusStore:
+    """
+    ZIP-by-variable float32 matrix of census estimates with label lookup through a LabelTrie.
+
+    :param zip_codes: Array of ZIP codes, one per row
+    :param labels: Variable labels, one per column, in depth-first trie order
+    :param values: 2D float32 array (usually memory-mapped) of shape (ZIP codes, labels)
+    """
+
+    def __init__(self, zip_codes, labels, values):
+        self.zip_codes = zip_codes
+        self.labels = labels
+        self.values = values
+        self.trie = LabelTrie(labels)
+
+    def __contains__(self, label):
+        return label in self.trie
+
+    def select(self, *patterns):
+        """
+        Select variables by label, or whole subtrees with patterns such as 'Housing Occupancy - *'.
+
+        :param patterns: Labels or wildcard prefixes
+        :return: DataFrame indexed by ZIP_CODE with one float32 column per selected label
+        """
+        positions = np.r_[tuple(self.trie.columns(pattern) for pattern in patterns)]
+        return pd.DataFrame(self.values[:, positions], index=pd.Index(self.zip_codes, name='ZIP_CODE'),
+                            columns=[self.labels[position] for position in positions])
+
+
+def get_census_store_dir():
+    return get_path_from_root("data", "final", "census_store")
+
+
+def _get_source_paths(tables):
+    return {table: get_path_from_root("data", "final", f"final_{table}.csv") for table in tables}
+
+
+def build_census_store(tables=CENSUS_TABLES, store_dir=None):
+    """
+    Parse the final census CSVs once and save them as a memory-mappable ZIP-by-variable store.
+
+    :param tables: Names of the final_<table>.csv files to include
+    :param store_dir: Directory to write the store to (default: data/final/census_store)
+    :return: CensusStore over the newly written files
+    """
+    store_dir = store_dir or get_census_store_dir()
+    source_paths = _get_source_paths(tables)
+
+    # Read every table as strings and line them up on ZIP code
+    frames = [pd.read_csv(path, dtype=str, keep_default_na=False).set_index('ZIP_CODE')
+              for path in source_paths.values()]
+    df = pd.concat(frames, axis=1, join='outer').fillna('')
+    if df.columns.has_duplicates:
+        duplicates = sorted(set(df.columns[df.columns.duplicated()]))
+        raise ValueError(f"Census labels appear in more than one table: {duplicates}")
+    df.index = df.index.astype('int32')
+    df = df.sort_index()
+
+    # Lay the columns out in trie order so every label subtree is a contiguous slice
+    order = LabelTrie(df.columns).order
+    labels = df.columns[order].tolist()
+    values = to_numeric_values(df.to_numpy()[:, order])
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, "values.npy"), values)
+    np.save(os.path.join(store_dir, "zip_codes.npy"), df.index.to_numpy())
+    meta = {
+        'labels': labels,
+        'sources': {table: get_file_fingerprint(path) for table, path in source_paths.items()},
+    }
+    with open(os.path.join(store_dir, "meta.json"), 'w') as f:
+        json.dump(meta, f)
+
+    logger.info(f"Census store written to {store_dir}: {values.shape[0]} ZIP codes x {values.shape[1]} variables")
+    return load_census_store(tables=tables, store_dir=store_dir, rebuild=False)
+
+
+def load_census_store(tables=CENSUS_TABLES, store_dir=None, rebuild=True):
+    """
+    Open the census store with its matrix memory-mapped, rebuilding it when the CSVs have changed.
+
+    :param tables: Names of the final_<table>.csv files the store should hold
+    :param store_dir: Directory of the store (default: data/final/census_store)
+    :param rebuild: Whether to rebuild a missing or stale store instead of returning it as is
+    :return: CensusStore
+    """
+    store_dir = store_dir or get_census_store_dir()
+    meta_path = os.path.join(store_dir, "meta.json")
+
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+
+    if rebuild:
+        sources = {table: get_file_fingerprint(path) for table, path in _get_source_paths(tables).items()}
+        if meta is None or meta['sources'] != sources:
+            return build_census_store(tables=tables, store_dir=store_dir)
+
+    values = np.load(os.path.join(store_dir, "values.npy"), mmap_mode='r')
+    zip_codes = np.load(os.path.join(store_dir, "zip_codes.npy"))
+    return CensusStore(zip_codes, meta['labels'], values)
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+
+from scripts.utility.path_utils import atomic_write, get_file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def get_checkpoint_path(output_path):
+    """
+    Get the path of the checkpoint file that tracks a partially written output.
+
+    :param output_path: Path to the output file being written
+    :return: path to the checkpoint file next to the output
+    """
+    return output_path + ".checkpoint.json"
+
+
+def save_checkpoint(output_path, source_path, source_offset, output_bytes, params=None, **state):
+    """
+    Record that everything before ``source_offset`` in the source has been committed to the output.
+
+    :param output_path: Path to the output file being written
+    :param source_path: Path to the source file being read
+    :param source_offset: Byte offset in the source up to which all records are committed
+    :param output_bytes: Size of the output file once those records were flushed
+    :param params: JSON-serializable parameters a resumed run must match
+    :param state: Any additional JSON-serializable state to restore on resume
+    """
+    checkpoint = {
+        'source_path': os.path.abspath(source_path),
+        'source_fingerprint': get_file_fingerprint(source_path),
+        'source_offset': source_offset,
+        'output_bytes': output_bytes,
+        'params': params,
+        **state,
+    }
+
+    with atomic_write(get_checkpoint_path(output_path)) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+
+
+def load_checkpoint(output_path, source_path, params=None):
+    """
+    Load the checkpoint of an interrupted run, if it is still valid.
+
+    A checkpoint is valid only for the same, unchanged source and the same parameters, and only while
+    the output still holds at least the committed bytes.
+
+    :param output_path: Path to the output file being written
+    :param source_path: Path to the source file being read
+    :param params: Parameters of the current run
+    :return: checkpoint dictionary, or None to start from scratch
+    """
+    checkpoint_path = get_checkpoint_path(output_path)
+    if not os.path.exists(checkpoint_path):
+        return None
+
+    try:
+        with open(checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {checkpoint_path}: {e}")
+        return None
+
+    if (checkpoint.get('source_path') != os.path.abspath(source_path)
+            or checkpoint.get('source_fingerprint') != get_file_fingerprint(source_path)
+            or checkpoint.get('params') != params
+            or not os.path.exists(output_path)
+            or os.path.getsize(output_path) < checkpoint.get('output_bytes', 0)):
+        logger.info(f"Discarding stale checkpoint {checkpoint_path}")
+        return None
+    return checkpoint
+
+
+def clear_checkpoint(output_path):
+    """
+    Remove the checkpoint once the output is complete.
+
+    :param output_path: Path to the output file that was written
+    """
+    checkpoint_path = get_checkpoint_path(output_path)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+def open_output_for_resume(output_path, checkpoint):
+    """
+    Open an output file for writing, continuing after the committed part when resuming.
+
+    Anything written after the last checkpoint is truncated away, since it belongs to a chunk that
+    was never committed.
+
+    :param output_path: Path to the output file
+    :param checkpoint: Checkpoint returned by load_checkpoint, or None to start a new file
+    :return: writable text file object positioned at the end of the committed output
+    """
+    if checkpoint is None:
+        return open(output_path, 'w', newline='')
+    os.truncate(output_path, checkpoint['output_bytes'])
+    return open(output_path, 'a', newline='')
@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+
+import geopandas as gpd
+import pandas as pd
+
+from config import CACHE_CONFIG
+from scripts.utility.frame_filters import filter_and_project, required_columns, to_pyarrow_filters, validate_filters
+from scripts.utility.path_utils import atomic_write, get_file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache_path(source_path):
+    """
+    Get the path of the columnar cache that sits next to a source file.
+
+    :param source_path: Path to the CSV/JSON/GeoJSON source
+    :return: path to the Parquet cache file
+    """
+    return source_path + CACHE_CONFIG['suffix']
+
+
+def _get_meta_path(cache_path):
+    return cache_path + ".json"
+
+
+def _is_fresh(cache_path, fingerprint):
+    meta_path = _get_meta_path(cache_path)
+    if not (os.path.exists(cache_path) and os.path.exists(meta_path)):
+        return False
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f) == fingerprint
+    except (OSError, ValueError):
+        return False
+
+
+def _write_cache(df, cache_path, fingerprint):
+    try:
+        with atomic_write(cache_path) as tmp_path:
+            df.to_parquet(tmp_path)
+        with open(_get_meta_path(cache_path), 'w') as f:
+            json.dump(fingerprint, f)
+    except Exception as e:
+        logger.warning(f"Could not write columnar cache {cache_path}: {e}")
+
+
+def read_cached(source_path, loader, geo=False, columns=None, filters=None):
+    """
+    Load a source file through a Parquet (GeoParquet for geodata) cache stored next to it.
+
+    The first call parses the source with ``loader`` and writes the cache; later calls read the cache
+    for as long as the source mtime and size are unchanged, keeping dtypes and parsed dates. Column
+    projection and filters are pushed down into the Parquet read when the cache is used.
+
+    :param source_path: Path to the source file
+    :param loader: Callable that parses the source path into a DataFrame; it must accept ``columns``
+        and ``filters`` keyword arguments whenever those are passed here
+    :param geo: True if the loader returns a GeoDataFrame
+    :param columns: Columns to return, or None for all columns
+    :param filters: List of (column, operator, value) tuples to filter rows on, or None
+    :return: DataFrame (or GeoDataFrame) with the source contents
+    """
+    validate_filters(filters)
+    projected = columns is not None or bool(filters)
+
+    if not CACHE_CONFIG['enabled']:
+        if projected:
+            return loader(source_path, columns=columns, filters=filters)
+        return loader(source_path)
+
+    cache_path = get_cache_path(source_path)
+    # The cache stays valid only while the source keeps the same mtime and size
+    fingerprint = get_file_fingerprint(source_path)
+
+    if _is_fresh(cache_path, fingerprint):
+        try:
+            read_parquet = gpd.read_parquet if geo else pd.read_parquet
+            df = read_parquet(cache_path, columns=required_columns(columns, filters),
+                              filters=to_pyarrow_filters(filters))
+            return filter_and_project(df, columns, filters)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable columnar cache {cache_path}: {e}")
+
+    # The cache always holds the full source, so it can serve any later projection
+    df = loader(source_path)
+    if not df.empty:
+        _write_cache(df, cache_path, fingerprint)
+    return filter_and_project(df, columns, filters)
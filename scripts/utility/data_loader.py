@@ -1,62 +1,136 @@
 import logging
+import os
 
 import geopandas as gpd
 import pandas as pd
 
+from scripts.utility.business_attributes import compact_business_dtypes, load_dtype_schema
+from scripts.utility.columnar_cache import read_cached
+from scripts.utility.frame_filters import filter_and_project, required_columns, to_pyarrow_filters, validate_filters
+from scripts.utility.json_reader import read_json_lines
 from scripts.utility.path_utils import get_path_from_root
 
 # Constants
 CHUNK_SIZE = 10000  # Adjust based on system's memory capability
+STATEWIDE_PARTITION = 'Statewide'  # County partition holding the state-level rows of the transportation dataset
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Function to stream data in chunks
+def iter_data_chunks(file_path, chunk_size=CHUNK_SIZE, columns=None, filters=None, workers=1):
+    """
+    Lazily yield a JSON-lines file as DataFrame chunks without holding the whole file.
+
+    :param file_path: Path to the JSON-lines file
+    :param chunk_size: Number of records per chunk
+    :param columns: Columns to keep, or None for all columns
+    :param filters: List of (column, operator, value) tuples applied to each chunk as it is parsed
+    :param workers: Number of parser processes; anything but 1 switches to the parallel byte-range reader,
+        whose chunks are sized in bytes and keep raw JSON types (None uses all cores)
+    :return: generator of DataFrames, one per chunk
+    """
+    if workers != 1:
+        yield from read_json_lines(file_path, workers=workers, columns=columns, filters=filters)
+        return
+
+    validate_filters(filters)
+    with pd.read_json(file_path, lines=True, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield filter_and_project(chunk, columns, filters)
+
+
 # Function to load data in chunks
-def load_data_in_chunks(file_path, chunk_size):
+def load_data_in_chunks(file_path, chunk_size, stream=False, columns=None, filters=None, workers=1):
+    """
+    Load a JSON-lines file chunk by chunk.
+
+    :param file_path: Path to the JSON-lines file
+    :param chunk_size: Number of records per chunk
+    :param stream: If True, return a generator of chunks instead of a single DataFrame
+    :param columns: Columns to keep, or None for all columns
+    :param filters: List of (column, operator, value) tuples applied to each chunk as it is parsed
+    :param workers: Number of parser processes (see iter_data_chunks)
+    :return: DataFrame built once from all chunks, or a generator of chunks when streaming
+    """
+    if stream:
+        return iter_data_chunks(file_path, chunk_size, columns=columns, filters=filters, workers=workers)
+
     try:
-        temp_df = pd.DataFrame()
-        for chunk in pd.read_json(file_path, lines=True, chunksize=chunk_size):
-            temp_df = pd.concat([temp_df, chunk])
-        return temp_df
+        # Collect the chunks and concatenate once, instead of re-copying the frame on every chunk
+        chunks = list(iter_data_chunks(file_path, chunk_size, columns=columns, filters=filters, workers=workers))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
     except Exception as e:
         logger.error(f"Error loading data from {file_path}: {e}")
         return pd.DataFrame()
 
 
 # Function to load business data
-def get_business_df():
+def get_business_df(stream=False, columns=None, filters=None, workers=1):
     business_path = get_path_from_root("data", "raw", "Yelp Data", "business.json")
-    return load_data_in_chunks(business_path, CHUNK_SIZE)
+    return load_data_in_chunks(business_path, CHUNK_SIZE, stream=stream, columns=columns, filters=filters,
+                               workers=workers)
 
 
 # Function to load review data
-def get_review_df():
+def get_review_df(stream=False, columns=None, filters=None, workers=1):
     review_path = get_path_from_root("data", "raw", "Yelp Data", "review.json")
-    return load_data_in_chunks(review_path, CHUNK_SIZE)
+    return load_data_in_chunks(review_path, CHUNK_SIZE, stream=stream, columns=columns, filters=filters,
+                               workers=workers)
+
+
+# Function to read a CSV file, filtering and projecting each chunk as it is parsed
+def _read_csv(path, columns=None, filters=None, parse_dates=(), dtype=None):
+    if columns is None and not filters:
+        df = pd.read_csv(path, dtype=dtype)
+        for col in parse_dates:
+            df[col] = pd.to_datetime(df[col])
+        return df
+
+    chunks = []
+    for chunk in pd.read_csv(path, usecols=required_columns(columns, filters), dtype=dtype, chunksize=CHUNK_SIZE):
+        for col in parse_dates:
+            if col in chunk.columns:
+                chunk[col] = pd.to_datetime(chunk[col])
+        chunks.append(filter_and_project(chunk, columns, filters))
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.concat(chunks, ignore_index=True)
+    if dtype:
+        # Categoricals with different categories per chunk come out of concat as objects
+        df = df.astype({col: col_dtype for col, col_dtype in dtype.items() if col in df.columns})
+    return df
+
+
+def _read_business_csv(path, columns=None, filters=None):
+    schema = load_dtype_schema(path)
+    if schema is not None:
+        return _read_csv(path, columns=columns, filters=filters, dtype=schema)
+
+    # Tables flattened before the schema was persisted are compacted after parsing
+    df = compact_business_dtypes(pd.read_csv(path))
+    return filter_and_project(df, columns, filters)
 
 
 # Function to load cleaned business data
-def get_clean_business_df():
+def get_clean_business_df(columns=None, filters=None):
     path = get_path_from_root("data", "interim", "flattened_business.csv")
     try:
-        # Attempt to read the file in the JSON lines format
-        return pd.read_csv(path)
-    except ValueError as e:
+        return read_cached(path, _read_business_csv, columns=columns, filters=filters)
+    except Exception as e:
         logger.error(f"Error loading cleaned business data: {e}")
-        try:
-            # Attempt to read a JSON file that is an array of objects
-            return pd.read_csv(path)
-        except ValueError as e2:
-            logger.error(f"Error loading cleaned business data: {e2}")
-    return pd.DataFrame()
+        return pd.DataFrame()
 
 
-def get_clean_review_df():
+def get_clean_review_df(columns=None, filters=None):
     path = get_path_from_root("data", "interim", "flattened_review.csv")
     try:
-        return pd.read_csv(path)
+        return read_cached(path, _read_csv, columns=columns, filters=filters)
     except Exception as e:
         logger.error(f"Error loading cleaned review data: {e}")
         return pd.DataFrame()
@@ -66,31 +140,67 @@ def get_clean_review_df():
 def get_geodata():
     path = get_path_from_root("data", "raw", "GIS Data", "export.geojson")
     try:
-        return gpd.read_file(path)
+        return read_cached(path, gpd.read_file, geo=True)
     except Exception as e:
         logger.error(f"Error loading GeoJSON data: {e}")
         return gpd.GeoDataFrame()
 
 
+def _read_google_trends(path):
+    trends_data = pd.read_csv(path)
+    trends_data['Month'] = pd.to_datetime(trends_data['Month'])
+    trends_data.set_index('Month', inplace=True)
+    return trends_data
+
+
 def get_google_trends_data():
     path = get_path_from_root("data", "raw", "Google Trend Data", "InterestOverTime_since2004.csv")
     try:
-        trends_data = pd.read_csv(path)
-        trends_data['Month'] = pd.to_datetime(trends_data['Month'])
-        trends_data.set_index('Month', inplace=True)
-        return trends_data
+        return read_cached(path, _read_google_trends)
     except Exception as e:
         logger.error(f"Error in loading Google Trends data: {e}")
         return pd.DataFrame()
 
 
-def get_clean_transportation_df():
+def _read_transportation(path, columns=None, filters=None):
+    return _read_csv(path, columns=columns, filters=filters, parse_dates=['Date'])
+
+
+def _read_parquet_dataset(path, columns=None, filters=None, null_partitions=None):
+    # Partition directories that cannot match the filters are skipped by pyarrow without being opened
+    df = pd.read_parquet(path, columns=required_columns(columns, filters), filters=to_pyarrow_filters(filters))
+
+    # Numeric partition keys such as years come back as categoricals; restore them so range filters work
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and pd.api.types.is_numeric_dtype(df[col].cat.categories):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+
+    # Turn the placeholder partitions of missing keys back into missing values before filtering
+    for col, placeholder in (null_partitions or {}).items():
+        if col in df.columns and placeholder in df[col].cat.categories:
+            df[col] = df[col].cat.remove_categories([placeholder])
+    return filter_and_project(df, columns, filters)
+
+
+def get_clean_transportation_df(columns=None, filters=None):
+    dataset_path = get_path_from_root("data", "interim", "cleaned_transportation")
     path = get_path_from_root("data", "interim", "cleaned_transportation.csv")
     try:
-        transportation_df = pd.read_csv(path)
-        transportation_df['Date'] = pd.to_datetime(transportation_df['Date'])
-        return transportation_df
-
+        # Prefer the county/year partitioned dataset written by clean_trips_data
+        if os.path.isdir(dataset_path):
+            return _read_parquet_dataset(dataset_path, columns=columns, filters=filters,
+                                         null_partitions={'County Name': STATEWIDE_PARTITION})
+        return read_cached(path, _read_transportation, columns=columns, filters=filters)
     except Exception as e:
         logger.error(f"Error in loading Transportation data: {e}")
         return pd.DataFrame()
+
+
+def get_clean_google_review_df(columns=None, filters=None):
+    path = get_path_from_root("data", "interim", "cleaned_google_reviews")
+    try:
+        # Year-partitioned dataset written chunk by chunk by clean_google_reviews
+        return _read_parquet_dataset(path, columns=columns, filters=filters)
+    except Exception as e:
+        logger.error(f"Error loading cleaned Google review data: {e}")
+        return pd.DataFrame()
@@ -0,0 +1,108 @@
+import hashlib
+import math
+
+import pandas as pd
+
+
+def _hash_key(key, digest_size=8):
+    return hashlib.blake2b(str(key).encode('utf-8'), digest_size=digest_size).digest()
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set for very large key streams.
+
+    Membership tests never miss a key that was added, but may report a key that was never added with
+    probability close to ``error_rate`` once ``capacity`` keys are stored.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: derive all bit positions from two 64-bit halves of one digest
+        digest = _hash_key(key, digest_size=16)
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        """
+        Add a key, returning True if it was (probably) already present.
+        """
+        present = True
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+
+class HashedKeySet:
+    """
+    Exact set of keys stored as 64-bit digests instead of the full key strings.
+    """
+
+    def __init__(self):
+        self.digests = set()
+
+    def add(self, key):
+        """
+        Add a key, returning True if it was already present.
+        """
+        digest = int.from_bytes(_hash_key(key), 'little')
+        if digest in self.digests:
+            return True
+        self.digests.add(digest)
+        return False
+
+
+class StreamingDeduplicator:
+    """
+    Drop records whose key was already seen in an earlier chunk of a stream (or earlier in the same chunk).
+
+    :param bloom_capacity: If set, track keys in a Bloom filter sized for this many keys instead of an exact
+        hashed set; uses far less memory, at the cost of dropping a few unique records as false positives
+    :param error_rate: False positive rate of the Bloom filter
+    """
+
+    def __init__(self, bloom_capacity=None, error_rate=0.001):
+        self.seen = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else HashedKeySet()
+        self.duplicates = 0
+
+    def add(self, keys):
+        """
+        Record keys as seen without filtering anything, e.g. keys already present in a resumed output.
+
+        :param keys: Iterable of keys
+        """
+        for key in keys:
+            if not pd.isna(key):
+                self.seen.add(key)
+
+    def new_mask(self, keys):
+        """
+        Flag the keys that have not been seen before, and record them as seen.
+
+        Missing keys are always kept, and left to the caller's own validation.
+
+        :param keys: Series of keys
+        :return: boolean list, True for the first occurrence of each key
+        """
+        mask = [pd.isna(key) or not self.seen.add(key) for key in keys]
+        self.duplicates += mask.count(False)
+        return mask
+
+    def drop_duplicates(self, df, key):
+        """
+        Keep only the rows of a chunk whose key has not been seen before.
+
+        :param df: DataFrame chunk
+        :param key: Name of the key column
+        :return: DataFrame without the duplicate rows
+        """
+        if df.empty:
+            return df
+        return df[self.new_mask(df[key])]
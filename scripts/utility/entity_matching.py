@@ -0,0 +1,211 @@
+import itertools
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.utility.path_utils import atomic_write
+
+try:
+    # rapidfuzz scores a whole block of names against each other in native code
+    from rapidfuzz import fuzz, process
+
+    def _score_matrix(queries, choices):
+        return process.cdist(queries, choices, scorer=fuzz.token_sort_ratio)
+except ImportError:
+    from fuzzywuzzy import fuzz
+
+    def _score_matrix(queries, choices):
+        return np.array([[fuzz.token_sort_ratio(query, choice) for choice in choices] for query in queries])
+
+logger = logging.getLogger(__name__)
+
+# Constants
+MATCH_CUTOFF = 70  # Minimum token sort ratio (0-100) for two names to be considered the same business
+GEOCELL_DEGREES = 0.02  # Size of the latitude/longitude cells used to block candidates (~2 km)
+KEY_COLUMNS = ['match_name', 'match_zip', 'cell_row', 'cell_col']  # Keys a match depends on
+
+
+def normalize_and_clean(texts):
+    """
+    Lowercase text and strip everything but letters, digits and single spaces.
+
+    :param texts: Series of strings (missing values become empty strings)
+    :return: Series of normalized strings
+    """
+    texts = texts.fillna('').astype(str).str.lower()
+    texts = texts.str.replace(r'[^a-z0-9\s]', '', regex=True)
+    return texts.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def normalize_zip_codes(zip_codes):
+    """
+    Normalize ZIP codes to their five-digit string form, whether they were read as numbers or strings.
+
+    :param zip_codes: Series of ZIP codes
+    :return: Series of five-digit strings, empty where the ZIP code is missing
+    """
+    return zip_codes.astype(str).str.extract(r'(\d{5})', expand=False).fillna('')
+
+
+def get_geocells(latitude, longitude, cell_degrees=GEOCELL_DEGREES):
+    """
+    Get the coarse grid cell of each coordinate.
+
+    :param latitude: Series of latitudes
+    :param longitude: Series of longitudes
+    :param cell_degrees: Size of a cell in degrees
+    :return: tuple of float arrays with the row and column of each cell (NaN where coordinates are missing)
+    """
+    rows = np.floor(pd.to_numeric(latitude, errors='coerce').to_numpy(dtype=float) / cell_degrees)
+    cols = np.floor(pd.to_numeric(longitude, errors='coerce').to_numpy(dtype=float) / cell_degrees)
+    return rows, cols
+
+
+def prepare_match_keys(df, name='name', zip_code='ZIP Code', latitude='latitude', longitude='longitude',
+                       cell_degrees=GEOCELL_DEGREES):
+    """
+    Build the normalized name, ZIP code and geocell used to block and score a set of businesses.
+
+    :param df: DataFrame of businesses
+    :param name: Column with the business name
+    :param zip_code: Column with the ZIP code
+    :param latitude: Column with the latitude
+    :param longitude: Column with the longitude
+    :param cell_degrees: Size of a geocell in degrees
+    :return: DataFrame with 'match_name', 'match_zip', 'cell_row' and 'cell_col' columns, aligned with df
+    """
+    rows, cols = get_geocells(df[latitude], df[longitude], cell_degrees)
+    return pd.DataFrame({
+        'match_name': normalize_and_clean(df[name]),
+        'match_zip': normalize_zip_codes(df[zip_code]),
+        'cell_row': rows,
+        'cell_col': cols,
+    }, index=df.index)
+
+
+def match_businesses(left_keys, right_keys, cutoff=MATCH_CUTOFF):
+    """
+    Find the best matching right-hand business for every left-hand business.
+
+    Candidates are blocked: a left business is only scored against right businesses sharing its ZIP
+    code or lying in its geocell or one of the eight around it. Each block of left businesses that
+    share a ZIP code and geocell is scored in a single similarity matrix.
+
+    :param left_keys: Match keys of the businesses to link, from prepare_match_keys
+    :param right_keys: Match keys of the businesses to link them to, from prepare_match_keys
+    :param cutoff: Minimum score for a match
+    :return: DataFrame with the 'left' and 'right' index labels and the 'score' of each match
+    """
+    right_names = right_keys['match_name'].to_numpy()
+
+    # Positions of the right-hand businesses in each ZIP code and each geocell
+    zip_index = right_keys.groupby('match_zip').indices
+    zip_index.pop('', None)
+    cell_index = right_keys.groupby(['cell_row', 'cell_col']).indices
+
+    matches = []
+    blocks = left_keys.groupby(['match_zip', 'cell_row', 'cell_col'], dropna=False, sort=False).indices
+    for (zip_code, cell_row, cell_col), positions in blocks.items():
+        candidates = [zip_index.get(zip_code, [])]
+        if not (np.isnan(cell_row) or np.isnan(cell_col)):
+            candidates += [cell_index.get((cell_row + d_row, cell_col + d_col), [])
+                           for d_row, d_col in itertools.product((-1, 0, 1), repeat=2)]
+        candidates = np.unique(np.concatenate(candidates)).astype(int)
+        if len(candidates) == 0:
+            continue
+
+        # Score the whole block at once and keep the best candidate of each business
+        scores = np.asarray(_score_matrix(left_keys['match_name'].to_numpy()[positions], right_names[candidates]))
+        best = scores.argmax(axis=1)
+        matches.append(pd.DataFrame({
+            'left': left_keys.index[positions],
+            'right': right_keys.index[candidates[best]],
+            'score': scores[np.arange(len(positions)), best],
+        }))
+
+    if not matches:
+        return pd.DataFrame(columns=['left', 'right', 'score'])
+    matches = pd.concat(matches, ignore_index=True)
+    return matches[matches['score'] >= cutoff].reset_index(drop=True)
+
+
+def _get_right_keys_path(table_path):
+    # Snapshot of the right-hand keys the match table was scored against
+    return table_path + ".right_keys.parquet"
+
+
+def _changed_labels(keys, previous):
+    # Index labels of the rows in keys that are new or whose match keys differ from the previous run
+    previous = previous.reindex(keys.index)
+    differs = keys[KEY_COLUMNS].ne(previous[KEY_COLUMNS]) & ~(keys[KEY_COLUMNS].isna() & previous[KEY_COLUMNS].isna())
+    return keys.index[differs.any(axis=1)]
+
+
+def _has_candidates_in(keys, others):
+    # Mask of the rows of keys that would have any of the others among their blocked candidates
+    near_zip = keys['match_zip'].isin(set(others['match_zip']) - {''})
+    others = others.dropna(subset=['cell_row', 'cell_col'])
+    offsets = list(itertools.product((-1, 0, 1), repeat=2))
+    cells = pd.MultiIndex.from_arrays([
+        np.concatenate([others['cell_row'].to_numpy() + d_row for d_row, _ in offsets]),
+        np.concatenate([others['cell_col'].to_numpy() + d_col for _, d_col in offsets]),
+    ])
+    near_cell = pd.MultiIndex.from_arrays([keys['cell_row'], keys['cell_col']]).isin(cells)
+    return near_zip.to_numpy() | near_cell
+
+
+def update_match_table(left_df, right_df, table_path, left_id='business_id', right_id='gmap_id'):
+    """
+    Bring a persisted match table up to date, rescoring only the businesses affected by changes.
+
+    The table holds one row per left-hand business with its normalized match keys, its best
+    right-hand candidate and that candidate's score, whether or not the score reaches the cutoff.
+    A left business is rescored when it is new or its keys changed, when a new or changed right
+    business falls in its candidate blocks, or when the right business it matched changed or is gone.
+
+    :param left_df: Businesses to link, with left_id, name, ZIP code and coordinate columns
+    :param right_df: Businesses to link them to, with right_id, name, ZIP code and coordinate columns
+    :param table_path: Path to the Parquet match table
+    :param left_id: Column identifying the left-hand businesses
+    :param right_id: Column identifying the right-hand businesses
+    :return: DataFrame with left_id, the match keys, right_id and score for every left business
+    """
+    left_df = left_df.drop_duplicates(subset=[left_id])
+    right_df = right_df.drop_duplicates(subset=[right_id])
+    left_keys = prepare_match_keys(left_df).set_axis(pd.Index(left_df[left_id], name=left_id))
+    right_keys = prepare_match_keys(right_df).set_axis(pd.Index(right_df[right_id], name=right_id))
+
+    # Load the table and right-hand keys of the previous run, if any
+    right_keys_path = _get_right_keys_path(table_path)
+    if os.path.exists(table_path) and os.path.exists(right_keys_path):
+        table = pd.read_parquet(table_path).set_index(left_id)
+        previous_right_keys = pd.read_parquet(right_keys_path).set_index(right_id)
+    else:
+        table = pd.DataFrame(columns=KEY_COLUMNS + [right_id, 'score'], index=pd.Index([], name=left_id))
+        previous_right_keys = pd.DataFrame(columns=KEY_COLUMNS, index=pd.Index([], name=right_id))
+
+    # Work out which left businesses can have a different best match than last time
+    changed_right = right_keys.loc[_changed_labels(right_keys, previous_right_keys)]
+    stale_right = changed_right.index.union(previous_right_keys.index.difference(right_keys.index))
+    rescore = (left_keys.index.isin(_changed_labels(left_keys, table))
+               | _has_candidates_in(left_keys, changed_right)
+               | left_keys.index.isin(table.index[table[right_id].isin(stale_right)]))
+
+    # Score them against their candidate blocks, keeping the best candidate whatever its score
+    matches = match_businesses(left_keys[rescore], right_keys, cutoff=0).set_index('left')
+    rescored = left_keys[rescore].assign(**{right_id: matches['right'], 'score': matches['score'].astype(float)})
+
+    # Keep the stored rows of the unchanged businesses that still exist
+    kept = table[table.index.isin(left_keys.index[~rescore])]
+    table = pd.concat([kept, rescored]).reindex(left_keys.index)
+    table = table.astype({**left_keys.dtypes.to_dict(), 'score': float})
+
+    # An interrupted run leaves the previous table intact
+    with atomic_write(table_path) as tmp_path:
+        table.reset_index().to_parquet(tmp_path, index=False)
+    with atomic_write(right_keys_path) as tmp_path:
+        right_keys.reset_index().to_parquet(tmp_path, index=False)
+    logger.info(f"Match table updated: {rescore.sum()} of {len(left_keys)} businesses rescored")
+    return table.reset_index()
@@ -0,0 +1,76 @@
+import pandas as pd
+
+# Supported filter operators; a filter is a (column, operator, value) tuple and a list of filters is AND-ed
+FILTER_OPERATORS = {
+    '==': lambda series, value: series == value,
+    '!=': lambda series, value: series != value,
+    '<': lambda series, value: series < value,
+    '<=': lambda series, value: series <= value,
+    '>': lambda series, value: series > value,
+    '>=': lambda series, value: series >= value,
+    'in': lambda series, value: series.isin(value),
+    'not in': lambda series, value: ~series.isin(value),
+    'contains': lambda series, value: series.str.contains(value, case=False, na=False),
+}
+
+# Operators that pyarrow can evaluate itself while reading a Parquet file
+PUSHDOWN_OPERATORS = {'==', '!=', '<', '<=', '>', '>=', 'in', 'not in'}
+
+
+def validate_filters(filters):
+    """
+    Check that every filter is a (column, operator, value) tuple with a supported operator.
+
+    :param filters: List of (column, operator, value) tuples, or None
+    """
+    for column, operator, _ in filters or []:
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator {operator!r} on column {column!r}")
+
+
+def required_columns(columns, filters):
+    """
+    Get the columns that must be read to both filter and project a frame.
+
+    :param columns: Columns requested by the caller, or None for all columns
+    :param filters: List of (column, operator, value) tuples, or None
+    :return: list of columns to read, or None to read all columns
+    """
+    if columns is None:
+        return None
+    needed = list(columns)
+    for column, _, _ in filters or []:
+        if column not in needed:
+            needed.append(column)
+    return needed
+
+
+def to_pyarrow_filters(filters):
+    """
+    Select the filters that can be pushed down into a Parquet read.
+
+    :param filters: List of (column, operator, value) tuples, or None
+    :return: list of pyarrow-compatible filters, or None if none apply
+    """
+    pushdown = [(column, operator, list(value) if operator in ('in', 'not in') else value)
+                for column, operator, value in filters or [] if operator in PUSHDOWN_OPERATORS]
+    return pushdown or None
+
+
+def filter_and_project(df, columns=None, filters=None):
+    """
+    Apply row filters and then keep only the requested columns.
+
+    :param df: DataFrame to filter
+    :param columns: Columns to keep, or None to keep all columns
+    :param filters: List of (column, operator, value) tuples, or None
+    :return: filtered and projected DataFrame
+    """
+    if filters:
+        mask = pd.Series(True, index=df.index)
+        for column, operator, value in filters:
+            mask &= FILTER_OPERATORS[operator](df[column], value)
+        df = df[mask]
+    if columns is not None:
+        df = df[list(columns)]
+    return df
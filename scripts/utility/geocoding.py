@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+import os
+
+import pandas as pd
+from geopy.exc import GeocoderRateLimited, GeocoderTimedOut, GeocoderUnavailable
+from geopy.geocoders import Nominatim
+
+from config import GEOCODING_CONFIG
+from scripts.utility.entity_matching import normalize_and_clean
+from scripts.utility.path_utils import get_path_from_root
+
+logger = logging.getLogger(__name__)
+
+
+def get_geocode_cache_path():
+    return get_path_from_root("data", "interim", "geocode_cache.jsonl")
+
+
+class GeocodeCache:
+    """
+    Persistent cache of geocoding results, stored as a JSON-lines file of {"key": ..., "value": ...} records.
+
+    Results are appended as soon as they arrive, so an interrupted run keeps everything it resolved.
+
+    :param path: Path to the cache file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._results = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut off by an interrupted write is simply looked up again
+                        continue
+                    self._results[record['key']] = record['value']
+
+    def __contains__(self, key):
+        return key in self._results
+
+    def get(self, key):
+        return self._results.get(key)
+
+    def put(self, key, value):
+        self._results[key] = value
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'key': key, 'value': value}) + '\n')
+
+
+class RateLimiter:
+    """
+    Space out the start of requests so that at most ``rate`` of them start per second.
+
+    :param rate: Maximum number of requests per second
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        await asyncio.sleep(start - now)
+
+
+class GeopyBackend:
+    """
+    Geocoding backend that runs a geopy geocoder in worker threads.
+
+    Any object with the same ``reverse``/``geocode`` coroutines and ``retryable_errors`` can be used as
+    a backend instead, e.g. a stand-in for tests.
+
+    :param geocoder: geopy geocoder, e.g. Nominatim
+    """
+
+    # Errors worth retrying; anything else fails the lookup straight away
+    retryable_errors = (GeocoderTimedOut, GeocoderUnavailable, GeocoderRateLimited)
+
+    def __init__(self, geocoder):
+        self.geocoder = geocoder
+
+    async def reverse(self, latitude, longitude):
+        location = await asyncio.to_thread(self.geocoder.reverse, (latitude, longitude), exactly_one=True)
+        if location is None:
+            return None
+        return location.raw.get('address', {}).get('postcode')
+
+    async def geocode(self, address):
+        location = await asyncio.to_thread(self.geocoder.geocode, address, exactly_one=True, addressdetails=True)
+        if location is None:
+            return None
+        return {
+            'latitude': location.latitude,
+            'longitude': location.longitude,
+            'postcode': location.raw.get('address', {}).get('postcode'),
+        }
+
+
+def get_nominatim_backend(config=GEOCODING_CONFIG):
+    """
+    Create a backend for the Nominatim server in the geocoding configuration.
+
+    :param config: Geocoding configuration (default: GEOCODING_CONFIG)
+    :return: GeopyBackend
+    """
+    return GeopyBackend(Nominatim(user_agent=config['user_agent'], domain=config['domain'], scheme=config['scheme']))
+
+
+class Geocoder:
+    """
+    Concurrent, rate-limited and cached geocoding on top of a pluggable backend.
+
+    Lookups are keyed by rounded coordinates or normalized address. Keys already in the cache are
+    never sent to the backend again, and each distinct key is looked up only once per call.
+
+    :param backend: Geocoding backend (default: Nominatim from GEOCODING_CONFIG)
+    :param cache_path: Path to the persistent result cache (default: data/interim/geocode_cache.jsonl)
+    :param config: Geocoding configuration (default: GEOCODING_CONFIG)
+    """
+
+    def __init__(self, backend=None, cache_path=None, config=GEOCODING_CONFIG):
+        self.backend = backend or get_nominatim_backend(config)
+        self.cache = GeocodeCache(cache_path or get_geocode_cache_path())
+        self.config = config
+
+    def _coordinate_key(self, latitude, longitude):
+        precision = self.config['coordinate_precision']
+        return f"reverse:{round(latitude, precision)},{round(longitude, precision)}"
+
+    async def _lookup(self, key, call, semaphore, rate_limiter):
+        # Ask the backend, retrying transient failures with exponential backoff
+        for attempt in range(self.config['max_retries'] + 1):
+            async with semaphore:
+                await rate_limiter.wait()
+                try:
+                    result = await call()
+                except self.backend.retryable_errors as e:
+                    error = e
+                except Exception as e:
+                    logger.warning(f"Geocoding {key} failed: {e}")
+                    return None
+                else:
+                    self.cache.put(key, result)
+                    return result
+            if attempt < self.config['max_retries']:
+                await asyncio.sleep(self.config['retry_backoff'] * 2 ** attempt)
+
+        # Failed lookups are not cached, so the next run tries them again
+        logger.warning(f"Geocoding {key} failed after {self.config['max_retries'] + 1} attempts: {error}")
+        return None
+
+    async def _resolve(self, calls):
+        # calls maps each key to a coroutine function performing its lookup
+        missing = [key for key in calls if key not in self.cache]
+        if missing:
+            logger.info(f"Geocoding {len(missing)} of {len(calls)} distinct lookups not in the cache")
+            semaphore = asyncio.Semaphore(self.config['max_concurrency'])
+            rate_limiter = RateLimiter(self.config['rate_limit'])
+            await asyncio.gather(*(self._lookup(key, calls[key], semaphore, rate_limiter) for key in missing))
+        return {key: self.cache.get(key) for key in calls}
+
+    async def reverse_zip_codes_async(self, latitude, longitude):
+        # Missing coordinates get no key, so they are neither looked up nor cached
+        keys = [self._coordinate_key(lat, lon) if pd.notna(lat) and pd.notna(lon) else None
+                for lat, lon in zip(latitude, longitude)]
+        calls = {key: (lambda lat=lat, lon=lon: self.backend.reverse(lat, lon))
+                 for key, lat, lon in zip(keys, latitude, longitude) if key is not None}
+        results = await self._resolve(calls)
+        return pd.Series([results.get(key) for key in keys], index=latitude.index, dtype=object)
+
+    async def geocode_addresses_async(self, addresses):
+        # Missing and empty addresses get no key, so they are neither looked up nor cached
+        keys = ["geocode:" + name if name else None for name in normalize_and_clean(addresses)]
+        calls = {key: (lambda address=address: self.backend.geocode(address))
+                 for key, address in zip(keys, addresses) if key is not None}
+        results = await self._resolve(calls)
+        return pd.Series([results.get(key) for key in keys], index=addresses.index, dtype=object)
+
+    def reverse_zip_codes(self, latitude, longitude):
+        """
+        Look up the postcode of each coordinate.
+
+        :param latitude: Series of latitudes
+        :param longitude: Series of longitudes, aligned with latitude
+        :return: Series of postcodes aligned with the inputs; None where a coordinate is missing or none was found
+        """
+        return asyncio.run(self.reverse_zip_codes_async(latitude, longitude))
+
+    def geocode_addresses(self, addresses):
+        """
+        Look up the coordinates and postcode of each address.
+
+        :param addresses: Series of addresses
+        :return: Series of {'latitude', 'longitude', 'postcode'} dictionaries aligned with the inputs;
+                 None where the address is missing or was not found
+        """
+        return asyncio.run(self.geocode_addresses_async(addresses))
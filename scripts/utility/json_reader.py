@@ -0,0 +1,151 @@
+import json
+import os
+import re
+
+import pandas as pd
+
+from scripts.utility.frame_filters import filter_and_project, validate_filters
+from scripts.utility.parallel import imap_ordered
+
+try:
+    # orjson decodes several times faster than the standard library when it is installed
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Constants
+RANGE_BYTES = 16 * 1024 * 1024  # Size of the byte range parsed by one worker task
+
+# Key prefilter of the current process, set up once per worker by _init_key_filter
+_key_filter = None
+
+
+def split_byte_ranges(file_path, range_bytes=RANGE_BYTES, start=0):
+    """
+    Split a JSON-lines file into byte ranges that start and end on line boundaries.
+
+    :param file_path: Path to the JSON-lines file
+    :param range_bytes: Approximate size of each range
+    :param start: Byte offset to start from; must be the start of a line
+    :return: list of (start, end) byte offsets covering the file from ``start`` to its end
+    """
+    size = os.path.getsize(file_path)
+    ranges = []
+    with open(file_path, 'rb') as f:
+        while start < size:
+            end = min(start + range_bytes, size)
+            if end < size:
+                # Move the boundary forward to just past the next newline
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def compile_field_pattern(field):
+    """
+    Compile a bytes pattern that captures the raw string value of a field in a JSON line.
+
+    Values with escape sequences do not match, so callers fall back to decoding those lines.
+
+    :param field: Name of the field
+    :return: compiled pattern whose first group is the raw value
+    """
+    return re.compile(rb'"' + re.escape(field.encode('utf-8')) + rb'"\s*:\s*"([^"\\]*)"')
+
+
+def read_field_values(file_path, field):
+    """
+    Read the values of one string field from a JSON-lines file without decoding whole records.
+
+    :param file_path: Path to the JSON-lines file
+    :param field: Name of the field
+    :return: list of the field's values, in file order
+    """
+    pattern = compile_field_pattern(field)
+    values = []
+    with open(file_path, 'rb') as f:
+        for line in f:
+            match = pattern.search(line)
+            if match:
+                values.append(match.group(1).decode('utf-8'))
+            elif line.strip():
+                values.append(_loads(line).get(field))
+    return values
+
+
+def _init_key_filter(key_filter):
+    global _key_filter
+    if key_filter is None:
+        _key_filter = None
+        return
+
+    field, values = key_filter
+    pattern = compile_field_pattern(field)
+    _key_filter = (field, pattern, frozenset(str(value).encode('utf-8') for value in values), set(values))
+
+
+def _keep_line(line):
+    # Lines whose key is found and is not wanted are skipped without being decoded
+    _, pattern, raw_values, _ = _key_filter
+    match = pattern.search(line)
+    return match is None or match.group(1) in raw_values
+
+
+def _parse_range(task):
+    file_path, start, end, columns, filters = task
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    lines = (line for line in data.split(b'\n') if line.strip())
+    if _key_filter is not None:
+        lines = filter(_keep_line, lines)
+    df = pd.DataFrame([_loads(line) for line in lines])
+    if df.empty:
+        return df
+
+    if _key_filter is not None:
+        # Exact check on the decoded values for the lines the byte-level prefilter could not rule out
+        field, _, _, values = _key_filter
+        df = df[df[field].isin(values)]
+    return filter_and_project(df, columns, filters)
+
+
+def read_json_lines(file_path, workers=None, range_bytes=RANGE_BYTES, columns=None, filters=None, key_filter=None,
+                    start=0, with_offsets=False):
+    """
+    Parse a JSON-lines file in parallel, one byte range per worker task.
+
+    Batches are yielded in file order. Values keep their JSON types; unlike ``pd.read_json`` no
+    date or numeric coercion is applied, so callers convert the columns they need.
+
+    ``key_filter`` is a byte-level prefilter for selective reads such as reviews of a few businesses:
+    the raw value of the key field is pulled out of each line and looked up in a hashed set, and only
+    matching lines are decoded.
+
+    :param file_path: Path to the JSON-lines file
+    :param workers: Number of worker processes, or None for all cores
+    :param range_bytes: Approximate size of the byte range parsed into each batch
+    :param columns: Columns to keep, or None for all columns
+    :param filters: List of (column, operator, value) tuples applied in the workers
+    :param key_filter: Optional (field, values) pair; only records whose string field is in values are kept
+    :param start: Byte offset to start reading from, e.g. a checkpointed offset; must be the start of a line
+    :param with_offsets: If True, yield (end_offset, DataFrame) pairs, where end_offset is the byte offset
+        just past the batch
+    :return: generator of DataFrames (or offset/DataFrame pairs), one per byte range
+    """
+    validate_filters(filters)
+    ranges = split_byte_ranges(file_path, range_bytes, start=start)
+    tasks = ((file_path, range_start, range_end, columns, filters) for range_start, range_end in ranges)
+    batches = imap_ordered(_parse_range, tasks, workers=workers,
+                           initializer=_init_key_filter, initargs=(key_filter,))
+
+    if with_offsets:
+        yield from zip((range_end for _, range_end in ranges), batches)
+    else:
+        yield from batches
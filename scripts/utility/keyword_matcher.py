@@ -0,0 +1,110 @@
+import collections
+import itertools
+import re
+
+import numpy as np
+
+# Constants
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")  # Words, keeping contractions such as "don't" whole
+BATCH_SIZE = 10000  # Number of texts matched per batch
+
+
+def tokenize_words(text):
+    """
+    Split text into lowercase word tokens, ignoring punctuation.
+
+    :param text: Text to tokenize (anything but a string gives no tokens)
+    :return: list of tokens
+    """
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over word tokens that finds every occurrence of a set of keywords and phrases.
+
+    Keywords are matched on whole tokens, so multi-word phrases such as 'wait time' are found in a single
+    pass over a text, however many keywords there are, and 'price' does not match inside 'priceless'.
+
+    :param keywords: Keywords or phrases to match; matching is case-insensitive and ignores punctuation
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.transitions = [{}]
+        self.fallbacks = [0]
+        self.outputs = [[]]
+
+        # Trie of the keywords' token sequences
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for token in tokenize_words(keyword):
+                if token not in self.transitions[state]:
+                    self.transitions[state][token] = len(self.transitions)
+                    self.transitions.append({})
+                    self.fallbacks.append(0)
+                    self.outputs.append([])
+                state = self.transitions[state][token]
+            if state:
+                self.outputs[state].append(index)
+
+        # Breadth-first, point every state at the longest proper suffix of its path that is also in the
+        # trie, and inherit the keywords ending at that suffix
+        queue = collections.deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self.transitions[state].items():
+                queue.append(child)
+                fallback = self.fallbacks[state]
+                while fallback and token not in self.transitions[fallback]:
+                    fallback = self.fallbacks[fallback]
+                self.fallbacks[child] = self.transitions[fallback].get(token, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fallbacks[child]]
+
+    def find(self, tokens):
+        """
+        Find every keyword occurrence in a token stream.
+
+        :param tokens: Iterable of lowercase tokens
+        :return: list of the indices of the matched keywords, one per occurrence
+        """
+        transitions, fallbacks, outputs = self.transitions, self.fallbacks, self.outputs
+        matches = []
+        state = 0
+        for token in tokens:
+            while state and token not in transitions[state]:
+                state = fallbacks[state]
+            state = transitions[state].get(token, 0)
+            matches.extend(outputs[state])
+        return matches
+
+    def count_matrix(self, texts, batch_size=BATCH_SIZE):
+        """
+        Count the occurrences of every keyword in every text, a batch of texts at a time.
+
+        :param texts: Iterable of texts
+        :param batch_size: Number of texts matched per batch
+        :return: int32 array of shape (texts, keywords)
+        """
+        texts = iter(texts)
+        width = len(self.keywords)
+        blocks = []
+        while True:
+            batch = list(itertools.islice(texts, batch_size))
+            if not batch:
+                break
+
+            # Flatten the matches of the batch into cell positions and count them all at once
+            rows, columns = [], []
+            for row, text in enumerate(batch):
+                matches = self.find(tokenize_words(text))
+                rows.extend([row] * len(matches))
+                columns.extend(matches)
+            cells = np.asarray(rows, dtype=np.int64) * width + np.asarray(columns, dtype=np.int64)
+            blocks.append(np.bincount(cells, minlength=len(batch) * width).astype(np.int32).reshape(len(batch), width))
+
+        if not blocks:
+            return np.zeros((0, width), dtype=np.int32)
+        return np.concatenate(blocks)
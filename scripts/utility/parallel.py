@@ -0,0 +1,53 @@
+import collections
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def get_worker_count(workers=None):
+    """
+    Resolve a worker count, defaulting to the number of CPU cores.
+
+    :param workers: Requested number of workers, or None for all cores
+    :return: number of worker processes to use (at least 1)
+    """
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def imap_ordered(func, iterable, workers=None, max_pending=None, initializer=None, initargs=()):
+    """
+    Map a function over an iterable in a process pool, yielding results in input order.
+
+    At most ``max_pending`` tasks are in flight at once, so memory stays bounded even when the
+    iterable is a long stream. With a single worker everything runs in the calling process.
+
+    :param func: Picklable function to apply to each item
+    :param iterable: Items to process
+    :param workers: Number of worker processes, or None for all cores
+    :param max_pending: Maximum number of submitted but not yet yielded tasks (default: 2 per worker)
+    :param initializer: Optional function run once in each worker before it takes tasks
+    :param initargs: Arguments for the initializer
+    :return: generator of results, in the same order as the inputs
+    """
+    workers = get_worker_count(workers)
+
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in iterable:
+            yield func(item)
+        return
+
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        pending = collections.deque()
+        try:
+            for item in iterable:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Drop queued work if the consumer stops early or a task fails
+            for future in pending:
+                future.cancel()
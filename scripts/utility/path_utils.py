@@ -1,3 +1,4 @@
+import contextlib
 import os
 
 from config import ROOT_DIR
@@ -22,3 +23,32 @@ def get_raw_data_path(filename):
     """
 
     return get_path_from_root("data", "raw", filename)
+
+
+def get_file_fingerprint(path):
+    """
+    Get a cheap fingerprint of a file that changes whenever the file is rewritten.
+
+    :param path: Path to the file
+    :return: dictionary with the file's modification time (ns) and size (bytes)
+    """
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """
+    Write a file through a temporary file that replaces it only once the write has completed, so an
+    interrupted write never leaves a torn file behind.
+
+    :param path: Path to the file to write
+    :return: context manager yielding the temporary path to write to
+    """
+    tmp_path = path + ".tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,46 @@
+import logging
+from functools import lru_cache
+
+import geopandas as gpd
+
+from scripts.utility.path_utils import get_path_from_root
+
+logger = logging.getLogger(__name__)
+
+# Coordinate reference system of the latitude/longitude columns in our data
+POINT_CRS = "EPSG:4326"
+
+
+@lru_cache(maxsize=None)
+def load_zip_polygons(shapefile_path=None):
+    """
+    Load the Pennsylvania ZIP code polygons once, with their spatial index built.
+
+    :param shapefile_path: Path to the ZIP code shapefile (default: PA_ZipCode_data.shp)
+    :return: GeoDataFrame with the 'ZIP_CODE' and 'geometry' of every ZIP code area
+    """
+    shapefile_path = shapefile_path or get_path_from_root("data", "raw", "shape_files_for_pa", "PA_ZipCode_data.shp")
+    polygons = gpd.read_file(shapefile_path, columns=['ZIP_CODE'])[['ZIP_CODE', 'geometry']]
+
+    _ = polygons.sindex  # Accessing the spatial index builds the R-tree now, so every lookup can reuse it
+    return polygons
+
+
+def reverse_geocode_zip_codes(latitude, longitude, zip_polygons=None):
+    """
+    Find the ZIP code area containing each point, without any network access.
+
+    :param latitude: Series of latitudes
+    :param longitude: Series of longitudes, aligned with latitude
+    :param zip_polygons: ZIP code polygons from load_zip_polygons (default: the PA shapefile)
+    :return: Series of ZIP codes aligned with the inputs; missing where a point is outside every area
+    """
+    zip_polygons = zip_polygons if zip_polygons is not None else load_zip_polygons()
+    points = gpd.GeoDataFrame(index=latitude.index, crs=POINT_CRS,
+                              geometry=gpd.points_from_xy(longitude, latitude)).to_crs(zip_polygons.crs)
+
+    # One point-in-polygon join for all points; 'intersects' also catches points on a border, which keep
+    # the first area found
+    joined = gpd.sjoin(points, zip_polygons, how='left', predicate='intersects')
+    zip_codes = joined.loc[~joined.index.duplicated(), 'ZIP_CODE']
+    return zip_codes.reindex(latitude.index)
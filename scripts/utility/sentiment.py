@@ -0,0 +1,161 @@
+import glob
+import hashlib
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from textblob import TextBlob
+
+from config import SENTIMENT_CONFIG
+from scripts.utility.parallel import get_worker_count, imap_ordered
+from scripts.utility.path_utils import atomic_write, get_path_from_root
+
+logger = logging.getLogger(__name__)
+
+# Constants
+POSITIVE_THRESHOLD = 0.2  # Polarity above which a review counts as positive
+NEGATIVE_THRESHOLD = -0.2  # Polarity below which a review counts as negative
+KEY_COLUMNS = ['review_id', 'text_hash']  # A stored score is reused only for the same review and text
+
+
+def get_sentiment_store_dir():
+    return get_path_from_root("data", "interim", "sentiment_scores")
+
+
+def hash_texts(texts):
+    """
+    Get a short content hash of each text, so a score is recomputed whenever a review's text changes.
+
+    :param texts: Series of strings
+    :return: Series of hexadecimal digests, aligned with texts
+    """
+    return texts.map(lambda text: hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest())
+
+
+def score_texts(texts):
+    # Score one batch of texts; runs in a worker process
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+
+def load_sentiment_scores(store_dir=None):
+    """
+    Load every score persisted so far.
+
+    :param store_dir: Directory of the score store (default: data/interim/sentiment_scores)
+    :return: DataFrame with 'review_id', 'text_hash' and 'polarity' columns, one row per key
+    """
+    store_dir = store_dir or get_sentiment_store_dir()
+    part_paths = sorted(glob.glob(os.path.join(store_dir, "part-*.parquet")))
+    if not part_paths:
+        return pd.DataFrame({'review_id': pd.Series(dtype=str), 'text_hash': pd.Series(dtype=str),
+                             'polarity': pd.Series(dtype=float)})
+    scores = pd.concat([pd.read_parquet(path) for path in part_paths], ignore_index=True)
+    return scores.drop_duplicates(subset=KEY_COLUMNS, keep='last').reset_index(drop=True)
+
+
+def _write_part(scores, store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    part_path = os.path.join(store_dir, f"part-{time.time_ns():020d}.parquet")
+    with atomic_write(part_path) as tmp_path:
+        scores.to_parquet(tmp_path, index=False)
+    return part_path
+
+
+def compact_sentiment_store(store_dir=None):
+    """
+    Merge the parts written by earlier runs into a single file.
+
+    :param store_dir: Directory of the score store (default: data/interim/sentiment_scores)
+    """
+    store_dir = store_dir or get_sentiment_store_dir()
+    part_paths = glob.glob(os.path.join(store_dir, "part-*.parquet"))
+    if len(part_paths) < 2:
+        return
+
+    # Write the merged part before removing the old ones; duplicates left by a crash are dropped on load
+    merged_path = _write_part(load_sentiment_scores(store_dir), store_dir)
+    for path in part_paths:
+        if path != merged_path:
+            os.remove(path)
+    logger.info(f"Compacted {len(part_paths)} sentiment score parts")
+
+
+def get_polarity(reviews, text='text', review_id='review_id', workers=None, batch_size=None, store_dir=None):
+    """
+    Get the TextBlob polarity of every review, scoring only reviews that were never scored before.
+
+    Scores are persisted by review id and text hash, so each review is scored once across all scripts
+    and runs. New texts are deduplicated and scored in batches across a process pool, and every
+    ``flush_size`` new scores are saved as they come in, so an interrupted run keeps its progress.
+
+    :param reviews: DataFrame of reviews
+    :param text: Column with the review text (missing or non-string text has a polarity of 0)
+    :param review_id: Column identifying the reviews, or None to key the scores on the text alone
+    :param workers: Number of scoring processes, or None for the configured default
+    :param batch_size: Number of texts per task sent to a worker, or None for the configured default
+    :param store_dir: Directory of the score store (default: data/interim/sentiment_scores)
+    :return: Series of polarities in [-1, 1], aligned with reviews
+    """
+    workers = workers if workers is not None else SENTIMENT_CONFIG['workers']
+    batch_size = batch_size or SENTIMENT_CONFIG['batch_size']
+    store_dir = store_dir or get_sentiment_store_dir()
+
+    # Work on positions, so reviews with a duplicated index still line up
+    texts = reviews[text].reset_index(drop=True)
+    texts = texts[texts.map(lambda value: isinstance(value, str))]
+    keys = pd.DataFrame({
+        'review_id': reviews[review_id].iloc[texts.index].astype(str).to_numpy() if review_id else '',
+        'text_hash': hash_texts(texts),
+    }, index=texts.index)
+
+    # Look up the stored scores, then score each distinct unseen text once
+    stored = load_sentiment_scores(store_dir)
+    known = pd.MultiIndex.from_frame(keys).isin(pd.MultiIndex.from_frame(stored[KEY_COLUMNS]))
+    missing = keys[~known].drop_duplicates()
+    missing_texts = pd.Series(texts[missing.index].to_numpy(), index=missing['text_hash'].to_numpy())
+    missing_texts = missing_texts[~missing_texts.index.duplicated()]
+
+    if len(missing_texts):
+        logger.info(f"Scoring {len(missing_texts)} new review texts for {len(missing)} reviews")
+        batches = (missing_texts.iloc[start:start + batch_size].tolist()
+                   for start in range(0, len(missing_texts), batch_size))
+        workers = min(get_worker_count(workers), -(-len(missing_texts) // batch_size))
+
+        polarities = np.empty(len(missing_texts))
+        done = flushed = 0
+        for batch_polarities in imap_ordered(score_texts, batches, workers=workers):
+            polarities[done:done + len(batch_polarities)] = batch_polarities
+            done += len(batch_polarities)
+            if done - flushed < SENTIMENT_CONFIG['flush_size'] and done < len(missing_texts):
+                continue
+
+            # Persist the scores gathered since the last flush
+            scored = pd.Series(polarities[flushed:done], index=missing_texts.index[flushed:done])
+            new_scores = missing[missing['text_hash'].isin(scored.index)]
+            new_scores = new_scores.assign(polarity=new_scores['text_hash'].map(scored))
+            _write_part(new_scores.reset_index(drop=True), store_dir)
+            stored = pd.concat([stored, new_scores], ignore_index=True)
+            flushed = done
+
+        if len(glob.glob(os.path.join(store_dir, "part-*.parquet"))) > SENTIMENT_CONFIG['max_parts']:
+            compact_sentiment_store(store_dir)
+
+    # Line the scores back up with the reviews
+    polarity = np.zeros(len(reviews))
+    polarity[keys.index] = keys.merge(stored, on=KEY_COLUMNS, how='left')['polarity'].to_numpy()
+    return pd.Series(polarity, index=reviews.index, name='sentiment')
+
+
+def categorize_polarity(polarity, positive=POSITIVE_THRESHOLD, negative=NEGATIVE_THRESHOLD):
+    """
+    Label polarities as 'positive', 'negative' or 'neutral'.
+
+    :param polarity: Series of polarities
+    :param positive: Polarity above which a review is positive
+    :param negative: Polarity below which a review is negative
+    :return: Series of sentiment categories, aligned with polarity
+    """
+    categories = np.select([polarity > positive, polarity < negative], ['positive', 'negative'], 'neutral')
+    return pd.Series(categories, index=polarity.index, name='sentiment_category')
@@ -0,0 +1,125 @@
+import functools
+import re
+
+import nltk
+from nltk.corpus import stopwords
+
+# Constants
+LEMMA_CACHE_SIZE = 2 ** 18  # Upper bound on the number of distinct words whose lemma is memoized
+
+URL_PATTERN = re.compile(r'http\S+')
+NON_LETTER_PATTERN = re.compile(r'[^a-zA-Z\s]')
+
+# On letters-only text nltk.word_tokenize reduces to a whitespace split plus these Treebank contraction splits
+TREEBANK_SPLITS = {
+    'cannot': ['can', 'not'],
+    'gimme': ['gim', 'me'],
+    'gonna': ['gon', 'na'],
+    'gotta': ['got', 'ta'],
+    'lemme': ['lem', 'me'],
+    'wanna': ['wan', 'na'],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_stop_words():
+    # Loaded once per process instead of once per review
+    return frozenset(stopwords.words("english"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_lemmatizer():
+    return nltk.WordNetLemmatizer()
+
+
+@functools.lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize_word(word):
+    """
+    Lemmatize a word with the default, noun and verb passes, memoized per distinct word.
+
+    :param word: Lowercase token
+    :return: lemmatized token
+    """
+    lemmatizer = get_lemmatizer()
+    word = lemmatizer.lemmatize(word)
+    word = lemmatizer.lemmatize(word, pos='n')  # Lemmatize nouns
+    return lemmatizer.lemmatize(word, pos='v')  # Lemmatize verbs
+
+
+def tokenize_letters(text):
+    """
+    Tokenize lowercase text that only contains letters and whitespace.
+
+    Gives the same tokens as ``nltk.word_tokenize`` on such text, without its general-purpose regex passes.
+
+    :param text: Lowercase, letters-only text
+    :return: list of tokens
+    """
+    words = []
+    for word in text.split():
+        split = TREEBANK_SPLITS.get(word)
+        if split:
+            words.extend(split)
+        else:
+            words.append(word)
+    return words
+
+
+def handle_negations(words):
+    # Example implementation - can be refined further
+    transformed_words = []
+    negation = False
+    for word in words:
+        if negation:
+            word = 'not_' + word
+            negation = False
+        if word in ['not', 'no']:
+            negation = True
+        else:
+            transformed_words.append(word)
+    return transformed_words
+
+
+def preprocess_text(text):
+    """
+    Normalize review text for sentiment analysis: strip URLs and non-letters, lowercase, drop stopwords,
+    handle negations and lemmatize.
+
+    :param text: Raw review text
+    :return: normalized text, or an empty string for missing text
+    """
+    # Check if the text is not a string
+    if not isinstance(text, str):
+        return ""
+
+    # Remove URLs
+    text = URL_PATTERN.sub('', text)
+
+    # Replace special characters and numbers
+    text = NON_LETTER_PATTERN.sub('', text)
+
+    # Tokenization and lowercase
+    words = tokenize_letters(text.lower())
+
+    # Stopword removal
+    stop_words = get_stop_words()
+    words = [word for word in words if word not in stop_words]
+
+    # Negation handling
+    words = handle_negations(words)
+
+    # Lemmatization
+    words = [lemmatize_word(word) for word in words]
+
+    # Rejoin words into a string
+    return " ".join(words)
+
+
+def preprocess_texts(texts):
+    """
+    Normalize a batch of review texts with preprocess_text.
+
+    :param texts: Iterable of raw review texts
+    :return: list of normalized texts, in the same order
+    """
+    return [preprocess_text(text) for text in texts]